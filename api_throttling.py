@@ -0,0 +1,150 @@
+"""
+Rate limiting, retries and adaptive concurrency for requests against the JobTech API.
+ThrottledSession is a drop-in replacement for requests.Session, so every request made by load_job_ads.py
+goes through the same token bucket, retry budget and concurrency limit.
+"""
+import random
+import threading
+import time
+from itertools import count
+import requests
+
+# Responses that mean "try again later" rather than "this request is wrong".
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Token bucket that allows 'rate' requests per second on average, with bursts of up to 'capacity' requests.
+# pause() stops all requests for a while, e.g. when the API answers with a Retry-After header.
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+# Concurrency limit that adapts to the API with AIMD (additive increase, multiplicative decrease).
+# The limit grows by about one request per round of successful requests while latency stays under
+# latency_target, and is halved when the API throttles or slows down. Used as a context manager around a request.
+class AdaptiveConcurrencyLimit:
+    def __init__(self, maximum, minimum=1, initial=None, latency_target=2.0):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(initial or max(minimum, maximum // 2))
+        self.latency_target = latency_target
+        self._in_flight = 0
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def record_success(self, latency):
+        if latency > self.latency_target:
+            self.record_throttle()
+            return
+        with self._condition:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    # Requests that were already in flight when the API started throttling fail together,
+    # so the limit is only decreased once per latency_target seconds.
+    def record_throttle(self):
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.latency_target:
+                self.limit = max(self.minimum, self.limit / 2)
+                self._last_decrease = now
+
+# requests.Session that rate limits, retries and adapts its concurrency.
+# Throttled (429), failing (5xx) and timed out requests are retried with jittered exponential backoff,
+# or after the Retry-After time given by the API. All retries of a session share one retry budget,
+# so a failing API stops the run instead of being retried forever.
+# When the retries or the budget run out, the last response is returned (raise_for_status() then raises)
+# or the last connection error is raised. 'retries' counts the retries made so far.
+class ThrottledSession(requests.Session):
+    def __init__(self, max_concurrent_requests, requests_per_second, timeout, max_retries=5, retry_budget=100,
+                 backoff_base=0.5, backoff_max=30.0):
+        super().__init__()
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.concurrency = AdaptiveConcurrencyLimit(max_concurrent_requests)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._retry_budget = retry_budget
+        self.retries = 0
+        self._retry_lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in count():
+            self.rate_limiter.acquire()
+            error = None
+            response = None
+            with self.concurrency:
+                started = time.monotonic()
+                try:
+                    response = super().request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+                latency = time.monotonic() - started
+
+            if response is not None and response.status_code not in RETRY_STATUS_CODES:
+                self.concurrency.record_success(latency)
+                return response
+            self.concurrency.record_throttle()
+
+            if attempt >= self.max_retries or not self._take_retry():
+                if error is not None:
+                    raise error
+                return response
+
+            retry_after = _retry_after(response)
+            if retry_after is not None:
+                self.rate_limiter.pause(retry_after)
+                time.sleep(retry_after)
+            else:
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+
+    def _take_retry(self):
+        with self._retry_lock:
+            if self._retry_budget <= 0:
+                return False
+            self._retry_budget -= 1
+            self.retries += 1
+            return True
+
+# Reads the Retry-After header (in seconds) of a response, if there is one.
+def _retry_after(response):
+    if response is None:
+        return None
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
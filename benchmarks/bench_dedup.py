@@ -0,0 +1,84 @@
+"""
+Benchmark of the duplicate check in load_job_ads.py at a growing number of historical job ads.
+
+It compares the old approach (reading every loaded ID into a Python set) with the merge write disposition
+that jobsearch_resource uses now. Each measurement runs in a fresh process, so the peak RSS belongs to that step only.
+
+Usage: python benchmarks/bench_dedup.py [history sizes ...]   (default: 1000000 10000000)
+"""
+import sys
+import time
+import resource
+import tempfile
+from pathlib import Path
+from concurrent.futures import Future, ProcessPoolExecutor
+import duckdb
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from load_job_ads import _create_pipeline, jobsearch_resource
+
+PAGE_SIZE = 100
+
+# Wraps a page of ads in a finished future, the same shape jobsearch_resource gets from submit_searches.
+def _completed_page(hits):
+    page = Future()
+    page.set_result({"total": {"value": len(hits)}, "hits": hits})
+    return page
+
+def _ads(prefix, count):
+    return [
+        {"id": f"{prefix}-{i}", "headline": "Benchmark", "publication_date": "2025-01-01T00:00:00"}
+        for i in range(count)
+    ]
+
+# The pipeline of load_job_ads.py, which adds the _dlt_load_id and _dlt_id columns to the Arrow tables, with its
+# working directory next to the database.
+def _pipeline(db_path):
+    return _create_pipeline(pipelines_dir=str(Path(db_path).parent / "dlt"), db_path=db_path)
+
+# Creates staging.job_ads through dlt and fills it with 'history_size' synthetic ads directly in DuckDB.
+def _create_history(db_path, history_size):
+    _pipeline(db_path).run(jobsearch_resource(params={}, pages=[_completed_page(_ads("seed", 1))]), table_name="job_ads")
+    with duckdb.connect(db_path) as con:
+        con.execute(f"""
+            INSERT INTO staging.job_ads (id, headline, publication_date, ingestion_timestamp, _dlt_load_id, _dlt_id)
+            SELECT 'history-' || i, 'Benchmark', TIMESTAMP '2025-01-01', now(), 'history', 'history-' || i
+            FROM range({history_size}) t(i)
+        """)
+
+# The approach before the merge write disposition: every loaded ID in a Python set.
+def _measure_existing_ids_set(db_path):
+    start = time.perf_counter()
+    with duckdb.connect(db_path) as con:
+        existing_ids = {row[0] for row in con.execute("SELECT DISTINCT id FROM staging.job_ads").fetchall()}
+    seconds = time.perf_counter() - start
+    return len(existing_ids), seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+# The current approach: one page where half of the ads are already loaded, merged on 'id' by DuckDB.
+def _measure_merge(db_path):
+    hits = _ads("history", PAGE_SIZE // 2) + _ads("new", PAGE_SIZE // 2)
+    start = time.perf_counter()
+    _pipeline(db_path).run(jobsearch_resource(params={}, pages=[_completed_page(hits)]), table_name="job_ads")
+    seconds = time.perf_counter() - start
+    with duckdb.connect(db_path) as con:
+        row_count = con.execute("SELECT count(*) FROM staging.job_ads").fetchone()[0]
+    return row_count, seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _run_isolated(function, *args):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(function, *args).result()
+
+def main(history_sizes):
+    print(f"{'history':>12} {'approach':<18} {'rows':>12} {'seconds':>9} {'peak RSS (MB)':>14}")
+    for history_size in history_sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = str(Path(tmp_dir) / "jobads_data_warehouse.duckdb")
+            _run_isolated(_create_history, db_path, history_size)
+
+            for approach, function in (("python id set", _measure_existing_ids_set), ("merge on id", _measure_merge)):
+                rows, seconds, max_rss_kb = _run_isolated(function, db_path)
+                print(f"{history_size:>12} {approach:<18} {rows:>12} {seconds:>9.2f} {max_rss_kb / 1024:>14.0f}")
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [1_000_000, 10_000_000])
@@ -0,0 +1,92 @@
+"""
+Benchmark of run_pipeline in load_job_ads.py against the local JobTech stand-in (benchmarks/mock_jobtech_api.py).
+
+For each number of ads, a mock server with that many synthetic ads (split over the three occupation fields) is
+started in its own process, and a full run loads them into an empty DuckDB database. The run happens in a fresh
+process, so the peak RSS belongs to that run only. Reported per run: ads/s, peak RSS and the time spent in
+extract (which includes fetching the pages), normalize and load.
+
+Usage: python benchmarks/bench_ingestion.py [ad counts ...] [--latency 0.02] [--error-rate 0.0]
+       (default: 10000 100000 1000000)
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import duckdb
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+MOCK_SERVER = REPO_ROOT / "benchmarks" / "mock_jobtech_api.py"
+MOCK_PORT = 8765
+OCCUPATION_FIELDS = ("GazW_2TU_kJw", "6Hq3_tKo_V57", "bh3H_Y3h_5eD")
+
+# The real API is limited to REQUESTS_PER_SECOND; the mock is not, so the benchmark measures the loader itself.
+REQUESTS_PER_SECOND = 1000
+
+# Starts the mock server and waits until it answers.
+def _start_mock_server(ads_per_field, latency, error_rate):
+    server = subprocess.Popen([
+        sys.executable, str(MOCK_SERVER), "--ads", str(ads_per_field), "--latency", str(latency),
+        "--error-rate", str(error_rate), "--port", str(MOCK_PORT),
+    ], stdout=subprocess.DEVNULL)
+    for _ in range(600):
+        try:
+            requests.get(f"http://127.0.0.1:{MOCK_PORT}/search", params={"limit": 0}, timeout=1)
+            return server
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("Mock JobTech API did not start")
+
+# Runs one full ingestion in a temporary directory, with its own database, landing zone and DLT state.
+def _measure_ingestion(work_dir):
+    os.environ["JOBTECH_API_URL"] = f"http://127.0.0.1:{MOCK_PORT}"
+    os.environ["JOBSTREAM_API_URL"] = f"http://127.0.0.1:{MOCK_PORT}"
+    os.environ["DLT_DATA_DIR"] = str(Path(work_dir) / "dlt")
+    os.environ["RUNTIME__DLTHUB_TELEMETRY"] = "false"
+    sys.path.append(str(REPO_ROOT))
+    import load_job_ads
+
+    load_job_ads.REQUESTS_PER_SECOND = REQUESTS_PER_SECOND
+    load_job_ads.DB_PATH = str(Path(work_dir) / "jobads_data_warehouse.duckdb")
+    load_job_ads.DB_LOCK_PATH = f"{load_job_ads.DB_PATH}.lock"
+    start = time.perf_counter()
+    metrics = load_job_ads.run_pipeline(
+        "", "job_ads", OCCUPATION_FIELDS, incremental=False, landing_root=Path(work_dir) / "landing" / "job_ads",
+    )
+    seconds = time.perf_counter() - start
+    with duckdb.connect(load_job_ads.DB_PATH) as con:
+        row_count = con.execute("SELECT count(*) FROM staging.job_ads").fetchone()[0]
+    return row_count, seconds, metrics["run"], resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _run_isolated(function, *args):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(function, *args).result()
+
+def main(ad_counts, latency, error_rate):
+    print(f"{'ads':>9} {'loaded':>9} {'seconds':>9} {'ads/s':>8} {'extract':>9} {'normalize':>10} {'load':>8} {'peak RSS (MB)':>14}")
+    for ad_count in ad_counts:
+        ads_per_field = ad_count // len(OCCUPATION_FIELDS)
+        server = _start_mock_server(ads_per_field, latency, error_rate)
+        try:
+            with tempfile.TemporaryDirectory() as work_dir:
+                rows, seconds, stages, max_rss_kb = _run_isolated(_measure_ingestion, work_dir)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{ads_per_field * len(OCCUPATION_FIELDS):>9} {rows:>9} {seconds:>9.1f} {rows / seconds:>8.0f} {stages['extract_seconds']:>9.1f} "
+              f"{stages['normalize_seconds']:>10.1f} {stages['load_seconds']:>8.1f} {max_rss_kb / 1024:>14.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("ad_counts", nargs="*", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--latency", type=float, default=0.02, help="mean response time of the mock in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of mock responses that are 429/503")
+    args = parser.parse_args()
+    main(args.ad_counts, args.latency, args.error_rate)
@@ -0,0 +1,102 @@
+"""
+Benchmark of the surrogate key types of macros/surrogate_key.sql in the dbt project: md5 strings
+(dbt_utils.generate_surrogate_key) against 64-bit integers taken from the same md5.
+
+For each key type, a synthetic star schema is built in its own DuckDB file: a fact table with one row per ad
+(5M by default), a job details dimension with one row per ad, and employer and occupation dimensions. The keys
+are generated with the same SQL the macro renders. Reported per key type: the time to build the tables, the
+size of the database file and the best of three runs of the fact-to-dimension joins the marts do.
+
+Usage: python benchmarks/bench_surrogate_keys.py [fact rows] [--threads N]   (default: 5000000)
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+import duckdb
+
+EMPLOYERS = 200_000
+OCCUPATIONS = 3_000
+JOIN_RUNS = 3
+
+# The SQL surrogate_key renders for one column, per key type.
+KEY_EXPRESSIONS = {
+    "md5": "md5(cast(coalesce(cast({column} as varchar), '_dbt_utils_surrogate_key_null_') as varchar))",
+    "hash": "('0x' || left(md5(coalesce(cast({column} as varchar), '_dbt_utils_surrogate_key_null_')), 16))::UBIGINT",
+}
+
+# The joins of mart_job_ads, aggregated so the result does not have to be materialized.
+JOIN_QUERY = """
+    SELECT o.occupation_field, count(*) AS ads, sum(f.vacancies) AS vacancies, count(DISTINCT e.employer_name) AS employers,
+           max(jd.headline) AS headline
+    FROM fct_job_ads f
+    LEFT JOIN dim_job_details jd ON f.job_details_id = jd.job_details_id
+    LEFT JOIN dim_occupation o ON f.occupation_id = o.occupation_id
+    LEFT JOIN dim_employer e ON f.employer_id = e.employer_id
+    GROUP BY o.occupation_field
+"""
+
+def _build_tables(con, key_type, fact_rows):
+    key = KEY_EXPRESSIONS[key_type].format
+    con.execute(f"""
+        CREATE TABLE dim_job_details AS
+        SELECT {key(column="id")} AS job_details_id, 'Rubrik ' || id AS headline
+        FROM (SELECT 'ad-' || range AS id FROM range({fact_rows}))
+    """)
+    con.execute(f"""
+        CREATE TABLE dim_employer AS
+        SELECT {key(column="workplace")} AS employer_id, 'Arbetsgivare ' || workplace AS employer_name
+        FROM (SELECT 'workplace-' || range AS workplace FROM range({EMPLOYERS}))
+    """)
+    con.execute(f"""
+        CREATE TABLE dim_occupation AS
+        SELECT {key(column="occupation")} AS occupation_id, 'Område ' || (hash(occupation) % 3) AS occupation_field
+        FROM (SELECT 'occupation-' || range AS occupation FROM range({OCCUPATIONS}))
+    """)
+    con.execute(f"""
+        CREATE TABLE fct_job_ads AS
+        SELECT
+            {key(column="occupation")} AS occupation_id,
+            {key(column="id")} AS job_details_id,
+            {key(column="workplace")} AS employer_id,
+            vacancies
+        FROM (
+            SELECT 'ad-' || range AS id,
+                   'occupation-' || (hash(range) % {OCCUPATIONS}) AS occupation,
+                   'workplace-' || (hash(range + 1) % {EMPLOYERS}) AS workplace,
+                   1 + range % 5 AS vacancies
+            FROM range({fact_rows})
+        )
+    """)
+    con.execute("CHECKPOINT")
+
+def _measure(key_type, fact_rows, threads, work_dir):
+    db_path = Path(work_dir) / f"keys_{key_type}.duckdb"
+    with duckdb.connect(str(db_path)) as con:
+        if threads:
+            con.execute(f"SET threads = {threads}")
+        start = time.perf_counter()
+        _build_tables(con, key_type, fact_rows)
+        build_seconds = time.perf_counter() - start
+
+        join_seconds = []
+        for _ in range(JOIN_RUNS):
+            start = time.perf_counter()
+            con.execute(JOIN_QUERY).fetchall()
+            join_seconds.append(time.perf_counter() - start)
+    return build_seconds, os.path.getsize(db_path), min(join_seconds)
+
+def main(fact_rows, threads):
+    print(f"{'key type':>9} {'fact rows':>10} {'build (s)':>10} {'file (MB)':>10} {'join (s)':>9}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for key_type in KEY_EXPRESSIONS:
+            build_seconds, file_bytes, join_seconds = _measure(key_type, fact_rows, threads, work_dir)
+            print(f"{key_type:>9} {fact_rows:>10} {build_seconds:>10.1f} {file_bytes / 1e6:>10.0f} {join_seconds:>9.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fact_rows", nargs="?", type=int, default=5_000_000)
+    parser.add_argument("--threads", type=int, default=0, help="DuckDB threads (default: all cores)")
+    args = parser.parse_args()
+    main(args.fact_rows, args.threads)
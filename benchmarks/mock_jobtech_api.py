@@ -0,0 +1,338 @@
+"""
+Local stand-in for the JobTech search API (https://jobsearch.api.jobtechdev.se), for benchmarks and offline runs.
+
+It serves /search with the parameters load_job_ads.py uses: offset, limit, occupation-field, occupation-group,
+region, municipality, published-after, published-before and stats. Hits are sorted by publication date.
+Like the JobTech stream API (https://jobstream.api.jobtechdev.se), /stream returns the ads removed or updated since
+'date', optionally filtered by 'occupation-concept-id'. Removed ads are no longer returned by /search.
+The ads are either synthetic (--ads per occupation field) or recorded pages from the landing zone (--recorded).
+Latency, maximum page size and error rate are configurable, and the 2000-offset ceiling of the real API is kept.
+
+Usage: python benchmarks/mock_jobtech_api.py --ads 10000 --latency 0.05 --error-rate 0.01 --port 8000
+Then point the loader at it: JOBTECH_API_URL=http://127.0.0.1:8000 JOBSTREAM_API_URL=http://127.0.0.1:8000 python load_job_ads.py
+"""
+import argparse
+import io
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import zstandard
+
+MAX_OFFSET = 2000
+MAX_LIMIT = 100
+
+OCCUPATION_FIELDS = (
+    ("GazW_2TU_kJw", "Yrken med social inriktning"),
+    ("6Hq3_tKo_V57", "Yrken med teknisk inriktning"),
+    ("bh3H_Y3h_5eD", "Chefer och verksamhetsledare"),
+)
+REGIONS = (
+    "Stockholms län", "Uppsala län", "Södermanlands län", "Östergötlands län", "Jönköpings län",
+    "Kronobergs län", "Kalmar län", "Gotlands län", "Blekinge län", "Skåne län", "Hallands län",
+    "Västra Götalands län", "Värmlands län", "Örebro län", "Västmanlands län", "Dalarnas län",
+    "Gävleborgs län", "Västernorrlands län", "Jämtlands län", "Västerbottens län", "Norrbottens län",
+)
+GROUPS_PER_FIELD = 12
+OCCUPATIONS_PER_GROUP = 6
+MUNICIPALITIES_PER_REGION = 14
+EMPLOYMENT_TYPES = ("Vanlig anställning", "Behovsanställning", "Sommarjobb / feriejobb")
+DURATIONS = ("Tills vidare", "3 - 6 månader", "Upp till 3 månader")
+
+# Search parameters that filter on a concept, and the 'stats' type with the same name.
+DIMENSIONS = ("occupation-field", "occupation-group", "region", "municipality")
+
+# Job ads in publication order, with one numpy column of concept codes per dimension for fast filtering.
+# 'concepts' maps each dimension to its list of (concept_id, label); code -1 means the ad has no value.
+# 'render(i)' returns the full JSON of ad number i. 'removed' holds the time an ad was removed (0 if it is not), and
+# 'updated' the time it was last edited (0 if it was not).
+class MockAds:
+    def __init__(self, published, codes, concepts, render, removed=None, updated=None):
+        self.published = published
+        self.codes = codes
+        self.concepts = concepts
+        self.render = render
+        self.removed = removed if removed is not None else np.zeros(len(published), dtype=np.int64)
+        self.updated = updated if updated is not None else np.zeros(len(published), dtype=np.int64)
+        self.concept_index = {
+            dimension: {concept_id: code for code, (concept_id, _) in enumerate(values)}
+            for dimension, values in concepts.items()
+        }
+
+    def search(self, query):
+        mask = self.removed == 0
+        for dimension in DIMENSIONS:
+            if dimension in query:
+                code = self.concept_index[dimension].get(query[dimension], -2)
+                mask &= self.codes[dimension] == code
+        if "published-after" in query:
+            mask &= self.published > _epoch(query["published-after"])
+        if "published-before" in query:
+            mask &= self.published < _epoch(query["published-before"])
+        indices = np.flatnonzero(mask)
+
+        offset = int(query.get("offset", 0))
+        limit = int(query.get("limit", 10))
+        result = {
+            "total": {"value": len(indices)},
+            "positions": len(indices),
+            "hits": [self.render(int(i)) for i in indices[offset:offset + limit]],
+        }
+        if "stats" in query:
+            result["stats"] = [self._stats(query["stats"], indices, int(query.get("stats.limit", 5)))]
+        return result
+
+    # Events since 'date' (and before 'updated-before-date'), for the given occupation fields (or all): a removal
+    # event for each removed ad, and the whole ad with the time of the change for each edited ad.
+    # The dates of the stream are in UTC, unlike the publication dates of the search.
+    def stream(self, query):
+        since = _utc_epoch(query["date"][-1])
+        until = _utc_epoch(query["updated-before-date"][-1]) if "updated-before-date" in query else None
+        fields = np.ones(len(self.published), dtype=bool)
+        if "occupation-concept-id" in query:
+            codes = [self.concept_index["occupation-field"].get(concept_id, -2) for concept_id in query["occupation-concept-id"]]
+            fields = np.isin(self.codes["occupation-field"], codes)
+
+        def changed(times):
+            mask = fields & (times > since)
+            return mask & (times < until) if until is not None else mask
+
+        removals = [
+            {
+                "id": self.render(int(i))["id"],
+                "removed": True,
+                "removed_date": datetime.fromtimestamp(int(self.removed[i]), tz=timezone.utc).isoformat(),
+                "occupation_field": dict(zip(("concept_id", "label"), self.concepts["occupation-field"][self.codes["occupation-field"][i]])),
+            }
+            for i in np.flatnonzero(changed(self.removed))
+        ]
+        updates = [
+            dict(self.render(int(i)), timestamp=int(self.updated[i]) * 1000)
+            for i in np.flatnonzero(changed(self.updated) & (self.removed == 0))
+        ]
+        return removals + updates
+
+    def _stats(self, dimension, indices, stats_limit):
+        counts = np.bincount(self.codes[dimension][indices] + 1, minlength=len(self.concepts[dimension]) + 1)[1:]
+        values = [
+            {"term": self.concepts[dimension][code][1], "concept_id": self.concepts[dimension][code][0],
+             "count": int(counts[code])}
+            for code in np.argsort(-counts, kind="stable")[:stats_limit]
+            if counts[code] > 0
+        ]
+        return {"type": dimension, "values": values}
+
+def _epoch(timestamp):
+    return int(datetime.fromisoformat(timestamp).timestamp())
+
+def _utc_epoch(timestamp):
+    timestamp = datetime.fromisoformat(timestamp)
+    return int((timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)).timestamp())
+
+def _concept(kind, number, label):
+    return f"mock-{kind}-{number:03d}", label
+
+# Creates 'ads_per_field' synthetic ads for each occupation field, published during the last 'days' days.
+# The same seed always gives the same ads. With 'edited_share', that share of the ads has a later deadline and one
+# more vacancy, as if the employer had edited them when the server started (for testing change detection between
+# two runs); the edits are reported by /stream.
+# With 'removed_share', that share of the ads was removed when the server started.
+def synthetic_ads(ads_per_field, days=60, seed=1, edited_share=0.0, removed_share=0.0):
+    # Anchored at midnight, so a restarted server serves the same ads during the same day.
+    start = int((datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)).timestamp())
+    rng = np.random.default_rng(seed)
+    total = ads_per_field * len(OCCUPATION_FIELDS)
+
+    field = np.repeat(np.arange(len(OCCUPATION_FIELDS)), ads_per_field)
+    group = field * GROUPS_PER_FIELD + rng.integers(0, GROUPS_PER_FIELD, total)
+    occupation = group * OCCUPATIONS_PER_GROUP + rng.integers(0, OCCUPATIONS_PER_GROUP, total)
+    municipality = rng.integers(0, len(REGIONS) * MUNICIPALITIES_PER_REGION, total)
+    published = start + rng.integers(0, days * 86400, total)
+
+    order = np.argsort(published, kind="stable")
+    published, field, group, occupation, municipality = (
+        array[order] for array in (published, field, group, occupation, municipality)
+    )
+    region = municipality // MUNICIPALITIES_PER_REGION
+
+    concepts = {
+        "occupation-field": list(OCCUPATION_FIELDS),
+        "occupation-group": [
+            _concept("group", number, f"{OCCUPATION_FIELDS[number // GROUPS_PER_FIELD][1]}, grupp {number % GROUPS_PER_FIELD + 1}")
+            for number in range(len(OCCUPATION_FIELDS) * GROUPS_PER_FIELD)
+        ],
+        "region": [_concept("region", number, name) for number, name in enumerate(REGIONS)],
+        "municipality": [
+            _concept("municipality", number, f"{REGIONS[number // MUNICIPALITIES_PER_REGION].removesuffix(' län')} kommun {number % MUNICIPALITIES_PER_REGION + 1}")
+            for number in range(len(REGIONS) * MUNICIPALITIES_PER_REGION)
+        ],
+    }
+    codes = {"occupation-field": field, "occupation-group": group, "region": region, "municipality": municipality}
+    edited = np.array([random.Random(-seed * 1_000_003 - i).random() < edited_share for i in range(total)], dtype=bool)
+
+    def render(i):
+        ad_rng = random.Random(seed * 1_000_003 + i)
+        published_at = datetime.fromtimestamp(int(published[i]))
+        occupation_label = f"{concepts['occupation-group'][group[i]][1]}, yrke {occupation[i] % OCCUPATIONS_PER_GROUP + 1}"
+        municipality_id, municipality_label = concepts["municipality"][municipality[i]]
+        region_id, region_label = concepts["region"][region[i]]
+        employer = f"Arbetsgivare {ad_rng.randint(1, 5000)}"
+        text = " ".join(ad_rng.choice(("Vi", "söker", "en", "erfaren", "medarbetare", "till", "vårt", "team")) for _ in range(ad_rng.randint(80, 300)))
+        deadline = published_at + timedelta(days=ad_rng.randint(7, 60))
+        vacancies = ad_rng.randint(1, 5)
+        if edited[i]:
+            deadline += timedelta(days=7)
+            vacancies += 1
+        return {
+            "id": str(10_000_000 + i),
+            "headline": f"{occupation_label} till {employer}",
+            "publication_date": published_at.isoformat(),
+            "application_deadline": deadline.isoformat(),
+            "last_publication_date": (published_at + timedelta(days=60)).isoformat(),
+            "number_of_vacancies": vacancies,
+            "relevance": 0.0,
+            "removed": False,
+            "description": {"text": text, "text_formatted": f"<p>{text}</p>"},
+            "employer": {"name": employer, "workplace": employer, "organization_number": f"{ad_rng.randint(0, 99999999):08d}"},
+            "workplace_address": {
+                "municipality": municipality_label, "municipality_concept_id": municipality_id,
+                "region": region_label, "region_concept_id": region_id,
+                "street_address": "Storgatan 1", "postcode": "111 22", "city": municipality_label, "country": "Sverige",
+            },
+            "occupation": {"concept_id": f"mock-occupation-{occupation[i]:04d}", "label": occupation_label, "legacy_ams_taxonomy_id": str(occupation[i])},
+            "occupation_group": dict(zip(("concept_id", "label"), concepts["occupation-group"][group[i]]), legacy_ams_taxonomy_id=str(group[i])),
+            "occupation_field": dict(zip(("concept_id", "label"), OCCUPATION_FIELDS[field[i]]), legacy_ams_taxonomy_id=str(field[i])),
+            "employment_type": {"label": ad_rng.choice(EMPLOYMENT_TYPES)},
+            "duration": {"label": ad_rng.choice(DURATIONS)},
+            "salary_type": {"label": "Fast månads- vecko- eller timlön"},
+            "scope_of_work": {"min": 100, "max": 100},
+            "application_details": {"url": f"https://example.org/jobb/{10_000_000 + i}"},
+            "driving_license_required": ad_rng.random() < 0.3,
+            "access_to_own_car": ad_rng.random() < 0.1,
+            "experience_required": ad_rng.random() < 0.6,
+            "must_have": {"skills": [{"label": "Svenska"}]},
+        }
+
+    now = int(datetime.now().timestamp())
+    removed = np.where(np.random.default_rng(seed + 1).random(total) < removed_share, now, 0)
+    return MockAds(published, codes, concepts, render, removed, np.where(edited, now, 0))
+
+# Loads recorded pages from the landing zone written by load_job_ads.py and serves the ads in them.
+def recorded_ads(landing_root):
+    ads = {}
+    for path in sorted(Path(landing_root).glob("run_id=*/occupation_field=*/part-*.jsonl.zst")):
+        with open(path, "rb") as landing_file:
+            with zstandard.ZstdDecompressor().stream_reader(landing_file) as reader:
+                for line in io.TextIOWrapper(reader, encoding="utf8"):
+                    for ad in json.loads(line).get("hits", []):
+                        ads[ad["id"]] = ad
+    ads = sorted(ads.values(), key=lambda ad: ad.get("publication_date") or "")
+
+    def concept_ids(ad):
+        address = ad.get("workplace_address") or {}
+        return {
+            "occupation-field": (ad.get("occupation_field") or {}).get("concept_id"),
+            "occupation-group": (ad.get("occupation_group") or {}).get("concept_id"),
+            "region": address.get("region_concept_id"),
+            "municipality": address.get("municipality_concept_id"),
+        }
+
+    labels = {
+        "occupation-field": lambda ad: ad["occupation_field"]["label"],
+        "occupation-group": lambda ad: ad["occupation_group"]["label"],
+        "region": lambda ad: ad["workplace_address"]["region"],
+        "municipality": lambda ad: ad["workplace_address"]["municipality"],
+    }
+    concepts = {dimension: [] for dimension in DIMENSIONS}
+    index = {dimension: {} for dimension in DIMENSIONS}
+    codes = {dimension: np.full(len(ads), -1) for dimension in DIMENSIONS}
+    for i, ad in enumerate(ads):
+        for dimension, concept_id in concept_ids(ad).items():
+            if concept_id is None:
+                continue
+            if concept_id not in index[dimension]:
+                index[dimension][concept_id] = len(concepts[dimension])
+                concepts[dimension].append((concept_id, labels[dimension](ad)))
+            codes[dimension][i] = index[dimension][concept_id]
+    published = np.array([_epoch(ad["publication_date"]) if ad.get("publication_date") else 0 for ad in ads], dtype=np.int64)
+
+    return MockAds(published, codes, concepts, lambda i: ads[i])
+
+# Handles /search and /stream requests. Settings are class attributes, set by create_server.
+class MockJobTechHandler(BaseHTTPRequestHandler):
+    ads = None
+    latency = 0.0
+    error_rate = 0.0
+    max_page_size = MAX_LIMIT
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        values = parse_qs(url.query)
+        query = {key: value[-1] for key, value in values.items()}
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+
+        if url.path not in ("/search", "/stream"):
+            return self._send(404, {"message": "Not found"})
+        if random.random() < self.error_rate:
+            if random.random() < 0.5:
+                return self._send(429, {"message": "Too many requests"}, {"Retry-After": "1"})
+            return self._send(503, {"message": "Service unavailable"})
+        if url.path == "/stream":
+            if "date" not in values:
+                return self._send(400, {"message": "date is required"})
+            return self._send(200, self.ads.stream(values))
+        if int(query.get("offset", 0)) > MAX_OFFSET or int(query.get("limit", 10)) > MAX_LIMIT:
+            return self._send(400, {"message": f"offset must be <= {MAX_OFFSET} and limit <= {MAX_LIMIT}"})
+
+        query["limit"] = min(int(query.get("limit", 10)), self.max_page_size)
+        self._send(200, self.ads.search(query))
+
+    def _send(self, status, body, headers=None):
+        content = json.dumps(body, ensure_ascii=False).encode("utf8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+def create_server(ads, port=8000, latency=0.0, error_rate=0.0, max_page_size=MAX_LIMIT):
+    handler = type("ConfiguredMockJobTechHandler", (MockJobTechHandler,), {
+        "ads": ads, "latency": latency, "error_rate": error_rate, "max_page_size": max_page_size,
+    })
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+# Starts the mock server in a background thread. Returns the server; call shutdown() to stop it.
+def start_server(ads, port=8000, **settings):
+    server = create_server(ads, port, **settings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ads", type=int, default=10_000, help="synthetic ads per occupation field")
+    parser.add_argument("--edited-share", type=float, default=0.0, help="share of synthetic ads that look edited")
+    parser.add_argument("--removed-share", type=float, default=0.0, help="share of synthetic ads that are removed")
+    parser.add_argument("--recorded", help="serve the ads in this landing zone (e.g. landing/job_ads) instead")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean response time in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 429/503")
+    parser.add_argument("--max-page-size", type=int, default=MAX_LIMIT, help="largest number of hits per page")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    ads = recorded_ads(args.recorded) if args.recorded else synthetic_ads(args.ads, edited_share=args.edited_share, removed_share=args.removed_share)
+    server = create_server(ads, args.port, args.latency, args.error_rate, args.max_page_size)
+    print(f"Mock JobTech API serving {len(ads.published)} ads on http://127.0.0.1:{args.port}/search and /stream")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
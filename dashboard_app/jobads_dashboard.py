@@ -1,6 +1,6 @@
 import streamlit as st
 import plotly.express as px
-from utils import load_data
+from utils import load_data, load_cube, count_ads, search_box
 from utils import get_latest_ingestion
 from map.hr_map import create_hr_map
 
@@ -138,14 +138,15 @@ def display_dataframe(filtered_df):
 
 # ======== SHOW MAPS AND METRICS ==========
 
-def display_map_and_charts(df, selected_field):
+# The charts are counted from the aggregate cube (see utils.load_cube), filtered like the ads themselves
+def display_map_and_charts(cube, selected_field):
     left_col, right_col = st.columns(2)
 
     # ----------- Map (right hand column) -----------
     with right_col:
         st.markdown("### Lediga tjänster per län - Alla")
-        if not df.empty:
-            create_hr_map(df, selected_field)
+        if not cube.empty:
+            create_hr_map(cube, selected_field)
         else:
             st.warning("Ingen data att visa på kartan!")
 
@@ -155,7 +156,7 @@ def display_map_and_charts(df, selected_field):
 
         # ---- Top 5 occupation ----
         st.markdown("### Topp 5 yrkestitlar")
-        top_jobs = df["occupation"].value_counts().head(5).reset_index()
+        top_jobs = count_ads(cube, "occupation").head(5).reset_index()
         top_jobs.columns = ["Yrkestitel", "Antal"]
 
         fig1 = px.bar(
@@ -186,7 +187,7 @@ def display_map_and_charts(df, selected_field):
 
         # ---- Top 5 regions ----
         st.markdown("### Topp 5 län")
-        top_regions = df["workplace_region"].value_counts().head(5).reset_index()
+        top_regions = count_ads(cube, "workplace_region").head(5).reset_index()
         top_regions.columns = ["Län", "Antal"]
 
         fig2 = px.bar(
@@ -215,7 +216,7 @@ def display_map_and_charts(df, selected_field):
 
         st.plotly_chart(fig2, use_container_width=True)
     
-def display_metrics(df):
+def display_metrics(cube):
     metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
 
     # ----- Metric that shows last data ingestion -----
@@ -228,18 +229,20 @@ def display_metrics(df):
 
     # ----- Metric that shows num of ads -----
     with metric_col2:
-        st.metric("Antal annonser", len(df))      
+        st.metric("Antal annonser", int(cube["ads"].sum()))
 
     # ----- Metric that shows top occupation -----
     with metric_col3:
-        top_occupation = df['occupation'].value_counts().idxmax()
-        count = df['occupation'].value_counts().max()
+        occupation_counts = count_ads(cube, 'occupation')
+        top_occupation = occupation_counts.idxmax()
+        count = occupation_counts.max()
         st.metric("Yrket med flest annonser", top_occupation, help=f"{count} annonser")
 
     # ----- Metric that shows top region -----
     with metric_col4:        
-        top_region = df['workplace_region'].value_counts().idxmax()
-        count = df['workplace_region'].value_counts().max()
+        region_counts = count_ads(cube, 'workplace_region')
+        top_region = region_counts.idxmax()
+        count = region_counts.max()
         st.metric("Länet med flest annonser", top_region, help=f"{count} annonser")
 
     st.markdown("---")
@@ -254,10 +257,11 @@ def main():
     df = load_data("mart.mart_all_jobs")      
     filters = show_sidebar(df)    
     filtered_df = apply_filters(df, filters)
+    filtered_cube = apply_filters(load_cube(), filters)
 
-    display_metrics(filtered_df)
-    display_map_and_charts(filtered_df, filters["occupation_field"])  
-    st.dataframe(display_dataframe(filtered_df))
+    display_metrics(filtered_cube)
+    display_map_and_charts(filtered_cube, filters["occupation_field"])  
+    st.dataframe(display_dataframe(search_box(filtered_df)))
 
 if __name__ == "__main__":
     main()
@@ -66,7 +66,11 @@ def create_hr_map(df, selected_occupation_field):
     
     if 'workplace_region' in df.columns:
         
-        region_counts = df['workplace_region'].value_counts().reset_index()
+        # The aggregate cube (utils.load_cube) already holds the number of ads per group
+        if 'ads' in df.columns:
+            region_counts = df.groupby('workplace_region')['ads'].sum().reset_index()
+        else:
+            region_counts = df['workplace_region'].value_counts().reset_index()
         region_counts.columns = ['region', 'count']
         
         region_counts['region_id'] = region_counts['region'].apply(map_region_names)
@@ -1,5 +1,5 @@
 import streamlit as st
-from utils import DataBase_Connection
+from utils import DataBase_Connection, search_box
 import pandas as pd
 import plotly.express as px
 
@@ -659,7 +659,7 @@ def main():
                 if filter_info:
                     st.info("**Aktiva filter:** " + " | ".join(filter_info))               
 
-                show_jobs_table(filtered_df)
+                show_jobs_table(search_box(filtered_df))
             else:
                 st.info("**Inga filter är aktiva ännu**\n\nAnvänd filtren i sidopanelen för att begränsa dina sökresultat och se en anpassad vy av chefsannonserna.")
 
@@ -1,5 +1,5 @@
 import streamlit as st
-from utils import load_data
+from utils import load_data, load_cube, count_ads, search_box
 from utils import get_latest_ingestion
 from utils import gemini_chat
 import pandas as pd
@@ -219,7 +219,8 @@ def show_html_table(df): #Code copied and pasted from
     
 
 # ======== SHOW METRIC DATA FUNCTION ========
-def show_metric_data(df):
+# Counts come from the aggregate cube (see utils.load_cube); the employer metrics need the ads themselves
+def show_metric_data(df, cube):
     st.markdown("#### Sammanfattning av annonser utifrån dina val")
     
     column1, column2, column3 = st.columns(3)     
@@ -233,10 +234,10 @@ def show_metric_data(df):
             st.warning("Kunde inte läsa uppdateringsdatum.")
 
     with column2:
-        df["week"] = df["publication_date"].apply(lambda d: d.isocalendar().week if pd.notnull(d) else None)
+        cube["week"] = cube["publication_week"].apply(lambda d: d.isocalendar().week if pd.notnull(d) else None)
         weekly_counts = (
-            df.groupby("week")
-            .size()
+            cube.groupby("week")["ads"]
+            .sum()
             .reset_index(name="count")
             .sort_values("week")
         )  
@@ -263,7 +264,7 @@ def show_metric_data(df):
         st.metric("Antal unika arbetsgivare", df['employer_name'].nunique())
     
     with column4:
-        st.metric("Antal aktiva annonser", df.shape[0])
+        st.metric("Antal aktiva annonser", int(cube["ads"].sum()))
         with st.popover("Visa antal annonser per vecka"):
             st.markdown("Antal annonser de senaste veckorna")
             
@@ -281,11 +282,11 @@ def show_metric_data(df):
             st.plotly_chart(fig, use_container_width=True)       
     
     with column5:
-        st.metric("Det mest eftersökta yrket just nu", df['occupation'].value_counts().idxmax())
+        st.metric("Det mest eftersökta yrket just nu", count_ads(cube, 'occupation').idxmax())
         with st.popover("Visa topp 5 yrken"):
             st.markdown("Topp 5 yrken")
             
-            counts = df['occupation'].value_counts().nlargest(5)
+            counts = count_ads(cube, 'occupation').nlargest(5)
 
             fig = px.bar(
                 x=counts.index, 
@@ -335,14 +336,14 @@ def employment_type_distribution(df):
     fig.update_layout(showlegend=True)
     st.plotly_chart(fig, use_container_width=True)
 
-def heatmap(df):
-    df = df.dropna(subset=["occupation_group", "workplace_region"])
+def heatmap(cube):
+    cube = cube.dropna(subset=["occupation_group", "workplace_region"])
 
-    pivot_df = df.pivot_table(
+    pivot_df = cube.pivot_table(
         index = "occupation_group",
         columns = "workplace_region",        
-        values = "occupation",
-        aggfunc = "count", 
+        values = "ads",
+        aggfunc = "sum", 
         fill_value = 0
     )
     top_occupations = pivot_df.sum(axis = 1).nlargest(10).index
@@ -388,8 +389,8 @@ def aux_attributes(df):
     fig.update_layout(xaxis_title="Antal annonser", yaxis_title="Krav")
     st.plotly_chart(fig, use_container_width=True)
 
-def top_5_jobs(df):
-    top_jobs = df["occupation_group"].value_counts().head(5).reset_index()
+def top_5_jobs(cube):
+    top_jobs = count_ads(cube, "occupation_group").head(5).reset_index()
     top_jobs.columns = ["Yrkesgrupp", "Antal"]
     top_jobs["Yrkesgrupp_kort"] = top_jobs["Yrkesgrupp"].apply(lambda x: " ".join(x.split()[:2]))
 
@@ -419,8 +420,8 @@ def top_5_jobs(df):
 
     st.plotly_chart(fig1, use_container_width=True)
 
-def top_5_regions(df):
-    top_regions = df["workplace_region"].value_counts().head(5).reset_index()
+def top_5_regions(cube):
+    top_regions = count_ads(cube, "workplace_region").head(5).reset_index()
     top_regions.columns = ["Län", "Antal"]
 
     fig2 = px.bar(
@@ -694,23 +695,24 @@ def main():
         
     
     else:      
+        filtered_cube = apply_sidebar_filters(load_cube("Yrken med social inriktning"), filters)
     
         tab1, tab2, tab3 = st.tabs(["Översikt 📎", "Heatmap 📎", "Matcha kandidater med jobb 📎"])
 
         with tab1:
-            show_metric_data(filtered_df)
+            show_metric_data(filtered_df, filtered_cube)
             st.markdown("---")
 
             column1, column2, column3 = st.columns(3)
     
             with column1:
                 st.subheader("Yrkesgrupper med flest lediga tjänster")
-                top_5_jobs(filtered_df)            
+                top_5_jobs(filtered_cube)            
     
         
             with column2:
                 st.subheader("Regioner med flest lediga tjänster")
-                top_5_regions(filtered_df)
+                top_5_regions(filtered_cube)
 
             with column3:
                 show_ai_insight(filtered_df)    
@@ -719,7 +721,7 @@ def main():
           
         
             
-            display_df = create_display_df(filtered_df)    
+            display_df = create_display_df(search_box(filtered_df, key="search_tab1"))    
             current_page_df = pagination(display_df, prefix="tab1")
 
             show_html_table(current_page_df)
@@ -728,7 +730,7 @@ def main():
             col1, col2 = st.columns([2, 1])
 
             with col1:
-                heatmap(filtered_df)
+                heatmap(filtered_cube)
             
             with col2:
                 st.markdown("""
@@ -4,7 +4,7 @@ import plotly.express as px
 from collections import Counter
 from pathlib import Path
 import time
-from utils import analyze_job_with_gemini, DataBase_Connection, setup_gemini, validate_gemini_response
+from utils import analyze_job_with_gemini, DataBase_Connection, setup_gemini, validate_gemini_response, load_job_text
 
 st.set_page_config(page_title="AI Kompetensanalys", layout="wide")
 
@@ -26,11 +26,11 @@ def load_job_data(occupation_field=None, limit=15):
         with DataBase_Connection() as conn:
             if occupation_field == 'Alla' or occupation_field is None:
                 tables = list(OCCUPATION_MAP.values())
-                union_queries = [f"SELECT job_id, headline, description, employer_name, occupation_field, occupation FROM mart.{table} WHERE description IS NOT NULL" for table in tables]
+                union_queries = [f"SELECT job_id, headline, employer_name, occupation_field, occupation FROM mart.{table}" for table in tables]
                 query = f"({' UNION ALL '.join(union_queries)}) ORDER BY job_id DESC LIMIT {limit}"
             else:
                 table = OCCUPATION_MAP.get(occupation_field, 'mart_occupation_social')
-                query = f"SELECT job_id, headline, description, employer_name, occupation_field, occupation FROM mart.{table} WHERE description IS NOT NULL LIMIT {limit}"
+                query = f"SELECT job_id, headline, employer_name, occupation_field, occupation FROM mart.{table} LIMIT {limit}"
                 
             return conn.execute(query).fetchdf()
     except Exception as e:
@@ -40,6 +40,10 @@ def load_job_data(occupation_field=None, limit=15):
 # === AI ANALYSIS FUNCTIONS ===
 def analyze_jobs(job_df, max_jobs=5):
     results = []
+    # The descriptions are only fetched for the jobs that are analyzed
+    job_df = job_df.head(max_jobs)
+    descriptions = load_job_text(tuple(job_df['job_id'].tolist())).set_index('job_id')['description']
+    job_df = job_df.assign(description=job_df['job_id'].map(descriptions).fillna('Ingen data'))
 
     with st.status(f"Analyserar {max_jobs} jobb...", expanded=True) as status:
         for i, (_, row) in enumerate(job_df.head(max_jobs).iterrows()):
@@ -27,17 +27,41 @@ class DataBase_Connection:
         if self.connection:
             self.connection.close()
 
+# The marts can also be read from their Parquet export (see export_marts.py) instead of the DuckDB file that the
+# pipeline and dbt write to. Set DASHBOARD_DATA_SOURCE=parquet to make that the default for load_data and load_cube;
+# the ad texts, the search and the latest ingestion time are always read from the DuckDB file.
+PARQUET_DIR = Path(os.getenv("MARTS_PARQUET_DIR", Path(__file__).parent.parent / "marts_parquet"))
+DATA_SOURCE = os.getenv("DASHBOARD_DATA_SOURCE", "duckdb")
 
+# Returns a connection for reading the marts from 'source': the DuckDB file, or an in-memory DuckDB that reads the Parquet files.
+def connect(source):
+    return duckdb.connect() if source == "parquet" else DataBase_Connection()
+
+# Returns what to select a mart (e.g. 'mart.mart_all_jobs') from: the table itself, or read_parquet over its export.
+# With hive_partitioning, occupation_field and publication_month are read from the directory names, so a filter on them
+# skips whole directories, and other filters are pushed down to the row group statistics of the files.
+def mart_relation(mart_table, source):
+    if source != "parquet":
+        return mart_table
+    files = PARQUET_DIR / mart_table.split(".")[-1] / "**" / "*.parquet"
+    return (f"read_parquet('{files}', hive_partitioning = true, "
+            "hive_types = {'occupation_field': VARCHAR, 'publication_month': VARCHAR})")
+
+
+# Loads the ads of a mart that are still open, from the DuckDB file or, with source="parquet", from the Parquet export.
 @st.cache_data(ttl=3600)  #cache data for 1 hour
-def load_data(mart_table):
+def load_data(mart_table, source=None):
+    source = source or DATA_SOURCE
     now = datetime.now(ZoneInfo("Europe/Stockholm")).date()
 
     try:
-        with DataBase_Connection() as conn:
-            df = conn.execute(f"SELECT * FROM {mart_table}").fetchdf()
+        with connect(source) as conn:
+            df = conn.execute(
+                f"SELECT * FROM {mart_relation(mart_table, source)} WHERE CAST(application_deadline AS DATE) >= ?", [now]
+            ).fetchdf()
+            df = df.drop(columns="publication_month", errors="ignore")
             df["publication_date"] = pd.to_datetime(df["publication_date"], errors="coerce").dt.date
             df["application_deadline"] = pd.to_datetime(df["application_deadline"], errors="coerce").dt.date
-            df = df[df["application_deadline"] >= now]
         
         print(f"Datan laddas från {mart_table}!")  #debug print 
         return df
@@ -46,6 +70,125 @@ def load_data(mart_table):
         st.error(f"Fel vid inläsning av data från {mart_table}: {e}")
         return pd.DataFrame()
 
+# Loads the pre-aggregated counts (mart.mart_job_ads_cube) of the ads that are still open, optionally for one occupation field.
+# The deadlines are rolled up in DuckDB, so each row holds the number of ads ('ads') and vacancies of a combination of
+# occupation, region, employment type, aux-attributes and publication week. The same filters as on load_data work on it.
+# Read from the Parquet export, only the partitions of the occupation field are opened.
+@st.cache_data(ttl=3600)  #cache data for 1 hour
+def load_cube(occupation_field=None, source=None):
+    source = source or DATA_SOURCE
+    now = datetime.now(ZoneInfo("Europe/Stockholm")).date()
+    query = f"""
+        SELECT occupation_field, occupation_group, occupation, workplace_region, workplace_municipality,
+               employment_type, driving_license_required, own_car_required, experience_required, publication_week,
+               CAST(SUM(ads) AS BIGINT) AS ads, CAST(SUM(vacancies) AS BIGINT) AS vacancies
+        FROM {mart_relation("mart.mart_job_ads_cube", source)}
+        WHERE application_deadline >= ?
+    """
+    parameters = [now]
+    if occupation_field is not None:
+        query += " AND occupation_field = ?"
+        parameters.append(occupation_field)
+    query += " GROUP BY ALL"
+
+    try:
+        with connect(source) as conn:
+            cube = conn.execute(query, parameters).fetchdf()
+            cube["publication_week"] = pd.to_datetime(cube["publication_week"], errors="coerce").dt.date
+        return cube
+
+    except Exception as e:
+        st.error(f"Fel vid inläsning av data från mart.mart_job_ads_cube: {e}")
+        return pd.DataFrame()
+
+# Fetches the description texts (mart.job_text) of the given ads, only when they are needed, e.g. for the AI analysis.
+# The marts themselves hold no long text. Returns a DataFrame with job_id, description and description_html_formatted.
+@st.cache_data(ttl=3600)  #cache data for 1 hour
+def load_job_text(job_ids):
+    try:
+        with DataBase_Connection() as conn:
+            return conn.execute(
+                """
+                SELECT job_id, description, description_html_formatted
+                FROM mart.job_text
+                WHERE job_id IN (SELECT unnest(?))
+                """,
+                [list(job_ids)],
+            ).fetchdf()
+
+    except Exception as e:
+        st.error(f"Fel vid inläsning av annonstexter: {e}")
+        return pd.DataFrame(columns=["job_id", "description", "description_html_formatted"])
+
+# Whether the full-text index of mart.job_text can be used: the fts extension is installed and dbt has built the index.
+def fts_index_available(conn):
+    try:
+        conn.execute("LOAD fts")
+    except duckdb.Error:
+        return False
+    return conn.execute(
+        "SELECT count(*) FROM information_schema.schemata WHERE schema_name = 'fts_mart_job_text'"
+    ).fetchone()[0] > 0
+
+# Search without the full-text index: the given ads whose headline or description contains every word of the search,
+# ignoring case. The score is the number of words found in the headline, so those ads come first.
+def search_job_ads_ilike(conn, search_text, job_ids):
+    patterns = ["%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%" for word in search_text.split()]
+    return conn.execute(
+        """
+        SELECT job_id, CAST(len(list_filter(?::VARCHAR[], p -> headline ILIKE p ESCAPE '\\')) AS DOUBLE) AS score
+        FROM mart.job_text
+        WHERE job_id IN (SELECT unnest(?))
+          AND list_bool_and(list_transform(?::VARCHAR[], p -> headline ILIKE p ESCAPE '\\' OR description ILIKE p ESCAPE '\\'))
+        ORDER BY score DESC
+        """,
+        [patterns, list(job_ids), patterns],
+    ).fetchdf()
+
+# Keyword search over the headlines and descriptions of the given ads, through the full-text (BM25) index that dbt
+# builds on mart.job_text. Only the given ads are scored, so every match among them is returned, however many ads
+# match elsewhere. Without the index (the fts extension is missing, or dbt has not built it yet), the search falls
+# back to search_job_ads_ilike. Returns a DataFrame with job_id and score, best match first.
+@st.cache_data(ttl=3600)  #cache data for 1 hour
+def search_job_ads(search_text, job_ids):
+    try:
+        with DataBase_Connection() as conn:
+            if not fts_index_available(conn):
+                print("Fulltextindex saknas, söker med ILIKE")  #debug print
+                return search_job_ads_ilike(conn, search_text, job_ids)
+            return conn.execute(
+                """
+                SELECT job_id, score
+                FROM (
+                    SELECT job_id, fts_mart_job_text.match_bm25(job_id, ?) AS score
+                    FROM mart.job_text
+                    WHERE job_id IN (SELECT unnest(?))
+                )
+                WHERE score IS NOT NULL
+                ORDER BY score DESC
+                """,
+                [search_text, list(job_ids)],
+            ).fetchdf()
+
+    except Exception as e:
+        st.error(f"Fel vid sökning i annonser: {e}")
+        return pd.DataFrame(columns=["job_id", "score"])
+
+# Search box for a page: returns the ads in 'df' that match the search, best match first, or 'df' itself when the box is empty.
+def search_box(df, key="search_text"):
+    search_text = st.text_input("Sök i annonser (rubrik och beskrivning):", key=key).strip()
+    if not search_text or df.empty:
+        return df
+
+    hits = search_job_ads(search_text, tuple(df["job_id"]))
+    matches = df.merge(hits, on="job_id").sort_values("score", ascending=False).drop(columns="score")
+    st.caption(f"{len(matches)} annonser matchar '{search_text}'")
+    return matches
+
+# Number of ads per value of a column in the cube, largest first, like value_counts() on the ads themselves
+def count_ads(cube, column):
+    return cube.groupby(column)["ads"].sum().sort_values(ascending=False)
+
 # Function to fetch the most recent ingestion timestamp from the staging.job_ads table
 # Connects to the DuckDB database in read-only mode, and returns the latest ingestion time
 def get_latest_ingestion():
@@ -0,0 +1,47 @@
+{#
+    Post-hook that builds a full-text (BM25) index over the given columns of the model, keyed by 'key', in the schema
+    fts_<schema>_<table> (see DuckDB's fts extension). DuckDB does not update an FTS index when the table changes,
+    and building one reads every row, so the index is only rebuilt when it is missing, on a full refresh, or when
+    ads were ingested since it was built. The latest ingestion_timestamp that each index covers is kept in
+    meta.fts_indexes. When the index is up to date, the hook does nothing.
+#}
+{% macro fts_index(key, columns, stemmer='swedish') -%}
+
+    {%- set table_name = this.schema ~ '.' ~ this.identifier -%}
+    {%- set up_to_date = false -%}
+
+    {%- if execute -%}
+        {%- do run_query("CREATE SCHEMA IF NOT EXISTS meta") -%}
+        {%- do run_query("""
+            CREATE TABLE IF NOT EXISTS meta.fts_indexes (
+                table_name VARCHAR PRIMARY KEY,
+                ingestion_timestamp TIMESTAMPTZ,
+                built_at TIMESTAMP
+            )
+        """) -%}
+    {%- endif -%}
+
+    {%- if execute and not flags.FULL_REFRESH -%}
+        {%- set result = run_query("""
+            SELECT EXISTS (SELECT 1 FROM information_schema.schemata WHERE schema_name = 'fts_"""
+                ~ this.schema ~ '_' ~ this.identifier ~ """')
+                AND (SELECT max(ingestion_timestamp) FROM """ ~ this ~ """) IS NOT DISTINCT FROM
+                    (SELECT ingestion_timestamp FROM meta.fts_indexes WHERE table_name = '""" ~ table_name ~ """')
+        """) -%}
+        {%- set up_to_date = result.columns[0].values()[0] -%}
+    {%- endif -%}
+
+    {%- if up_to_date -%}
+
+        SELECT 1
+
+    {%- else -%}
+
+        INSTALL fts;
+        LOAD fts;
+        PRAGMA create_fts_index('{{ table_name }}', '{{ key }}', '{{ columns | join("', '") }}', stemmer='{{ stemmer }}', stopwords='none', overwrite=1);
+        INSERT OR REPLACE INTO meta.fts_indexes SELECT '{{ table_name }}', max(ingestion_timestamp), now() FROM {{ this }}
+
+    {%- endif -%}
+
+{%- endmacro %}
@@ -0,0 +1,19 @@
+{#
+    Filter for incremental models: on an incremental run, only rows ingested since the last run are processed.
+    The latest ingestion already in the model is processed again, which is harmless with the delete+insert strategy
+    and picks up rows of that ingestion that were loaded after the model was built.
+    On a first run or with --full-refresh, every row is processed.
+#}
+{% macro ingested_since_last_run(column='ingestion_timestamp') -%}
+
+    {%- if is_incremental() -%}
+
+        {{ column }} >= (SELECT coalesce(max({{ column }}), TIMESTAMPTZ '1900-01-01') FROM {{ this }})
+
+    {%- else -%}
+
+        TRUE
+
+    {%- endif -%}
+
+{%- endmacro %}
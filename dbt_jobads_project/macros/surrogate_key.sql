@@ -0,0 +1,34 @@
+{#
+    Surrogate key of the given columns, for the keys of the dim_* models and fct_job_ads.
+    key_type (default: the surrogate_key_type var):
+      'hash' - a 64-bit integer (UBIGINT): the first 16 hex digits of the same md5 as the 'md5' key type.
+               Joins compare 8-byte integers instead of 32-character strings, and the key columns are a fraction
+               of the size in the warehouse. md5 is used rather than DuckDB's hash(), which may change between
+               DuckDB versions, since the keys are kept in incremental models.
+               With n keys, the chance of a collision is about n^2 / 2^65: one in four million for three million keys.
+      'md5'  - the 32-character md5 string of dbt_utils.generate_surrogate_key.
+    NULLs are replaced the same way dbt_utils does, so a NULL and an empty string get different keys.
+    Changing the key type changes the column types of incremental models: rebuild them with dbt run --full-refresh.
+#}
+{% macro surrogate_key(field_list, key_type=var('surrogate_key_type', 'hash')) -%}
+
+    {%- if key_type == 'md5' -%}
+
+        {{ dbt_utils.generate_surrogate_key(field_list) }}
+
+    {%- elif key_type == 'hash' -%}
+
+        ('0x' || left(md5(
+        {%- for field in field_list -%}
+            coalesce(cast({{ field }} as varchar), '_dbt_utils_surrogate_key_null_')
+            {%- if not loop.last %} || '-' || {% endif -%}
+        {%- endfor -%}
+        ), 16))::UBIGINT
+
+    {%- else -%}
+
+        {{ exceptions.raise_compiler_error("surrogate_key: unknown key_type '" ~ key_type ~ "', expected 'hash' or 'md5'") }}
+
+    {%- endif -%}
+
+{%- endmacro %}
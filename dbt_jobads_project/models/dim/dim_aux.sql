@@ -1,14 +1,20 @@
+{{ config(unique_key='auxiliary_attributes_id') }}
+
 with dim_aux as (
-    select distinct
+    select
     driving_license_required,
     own_car_required,
-    experience_required
+    experience_required,
+    max(ingestion_timestamp) as ingestion_timestamp
     from {{ ref('src_aux') }}
+    where {{ ingested_since_last_run() }}
+    group by driving_license_required, own_car_required, experience_required
     )
 
 select
-    {{ dbt_utils.generate_surrogate_key(['driving_license_required', 'own_car_required', 'experience_required']) }} as auxiliary_attributes_id,
+    {{ surrogate_key(['driving_license_required', 'own_car_required', 'experience_required']) }} as auxiliary_attributes_id,
     driving_license_required,
     own_car_required,
-    experience_required
+    experience_required,
+    ingestion_timestamp
 from dim_aux
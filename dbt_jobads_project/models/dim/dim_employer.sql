@@ -1,7 +1,10 @@
+{{ config(unique_key='employer_id') }}
+
 WITH dim_employer AS (
-    SELECT * FROM {{ ref('src_employer') }})
+    SELECT * FROM {{ ref('src_employer') }}
+    WHERE {{ ingested_since_last_run() }})
 SELECT 
-    {{ dbt_utils.generate_surrogate_key(['employer_workplace', 'workplace_municipality']) }} AS employer_id, 
+    {{ surrogate_key(['employer_workplace', 'workplace_municipality']) }} AS employer_id, 
     COALESCE (employer_name, 'Ingen data') AS employer_name,
     COALESCE (employer_workplace, 'Ingen data') AS employer_workplace,
     COALESCE (employer_organization_number, 'Ingen data') AS employer_organization_number,
@@ -10,5 +13,8 @@ SELECT
     COALESCE (workplace_postcode, 'Ingen data') AS workplace_postcode,
     COALESCE (workplace_city, 'Ingen data') AS workplace_city,
     COALESCE (workplace_country, 'Ingen data') AS workplace_country,
-    COALESCE (workplace_municipality, 'Ingen data') AS workplace_municipality
-FROM dim_employer WHERE employer_id IS NOT NULL
\ No newline at end of file
+    COALESCE (workplace_municipality, 'Ingen data') AS workplace_municipality,
+    ingestion_timestamp
+FROM dim_employer WHERE employer_id IS NOT NULL
+-- One row per employer: the unique_key is replaced with the latest ad of the employer
+QUALIFY ROW_NUMBER() OVER (PARTITION BY employer_id ORDER BY ingestion_timestamp DESC) = 1
\ No newline at end of file
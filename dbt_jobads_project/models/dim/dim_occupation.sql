@@ -1,14 +1,19 @@
+{{ config(unique_key='occupation_id') }}
+
 -- Create a temporary table (CTE) to store the occupation data from the source table
+-- On incremental runs, only the occupations of ads ingested since the last run are rebuilt
 with dim_occupation as (
-    select * from {{ ref('src_occupation') }})
+    select * from {{ ref('src_occupation') }}
+    where {{ ingested_since_last_run() }})
 
 -- Build the final occupation dimension table by selecting distinct values from the temporary table
 -- and generating a surrogate key for the occupation
     select
-    {{ dbt_utils.generate_surrogate_key(['occupation']) }} as occupation_id,
+    {{ surrogate_key(['occupation']) }} as occupation_id,
     max (occupation) as occupation, 
     max(occupation_group) as occupation_group, -- get a representative group for each occupation
-    max(occupation_field) as occupation_field -- get a representative field for each occupation
+    max(occupation_field) as occupation_field, -- get a representative field for each occupation
+    max(ingestion_timestamp) as ingestion_timestamp
 from dim_occupation
 group by occupation -- group by occupation to ensure unique values
 
@@ -1,14 +1,23 @@
+{{ config(
+    unique_key='job_details_id',
+    post_hook="DELETE FROM {{ this }} WHERE job_details_id IN (SELECT {{ surrogate_key(['id']) }} FROM {{ source('job_ads', 'stg_ads_removed') }})"
+) }}
+
+-- Only the ads ingested since the last run are processed. Ads that were loaded earlier and have since been
+-- removed from Platsbanken are deleted by the post_hook, since src_job_ads only leaves out removed ads it reads.
 WITH job_ads AS (
-    SELECT * FROM {{ ref('src_job_ads') }}    
+    SELECT * FROM {{ ref('src_job_ads') }}
+    WHERE {{ ingested_since_last_run() }}
 )
 
 SELECT
 
-    {{ dbt_utils.generate_surrogate_key(['occupation__label']) }} AS occupation_id,
-    {{ dbt_utils.generate_surrogate_key(['id']) }} AS job_details_id,
-    {{ dbt_utils.generate_surrogate_key(['employer__workplace', 'workplace_address__municipality']) }} AS employer_id,
-    {{ dbt_utils.generate_surrogate_key(['driving_license_required', 'own_car_required', 'experience_required']) }} AS auxiliary_attributes_id,
+    {{ surrogate_key(['occupation__label']) }} AS occupation_id,
+    {{ surrogate_key(['id']) }} AS job_details_id,
+    {{ surrogate_key(['employer__workplace', 'workplace_address__municipality']) }} AS employer_id,
+    {{ surrogate_key(['driving_license_required', 'own_car_required', 'experience_required']) }} AS auxiliary_attributes_id,
     vacancies,
     relevance,
-    application_deadline
+    application_deadline,
+    ingestion_timestamp
 FROM job_ads
\ No newline at end of file
@@ -0,0 +1,24 @@
+{{ config(
+    materialized='incremental',
+    unique_key='job_id',
+    incremental_strategy='delete+insert',
+    on_schema_change='sync_all_columns',
+    post_hook="{{ fts_index('job_id', ['headline', 'description']) }}"
+) }}
+
+-- The long text of each job ad, keyed by the job_id of the marts. The marts only hold scalar columns, so the
+-- dashboard loads them without megabytes of text and fetches the text of a few ads when it is needed.
+-- Built incrementally like the dimensions (see macros/ingested_since_last_run.sql).
+-- The post_hook builds a full-text (BM25) index over headline and description, which the dashboard's search
+-- box queries through fts_mart_job_text.match_bm25. DuckDB does not update an FTS index when the table
+-- changes, so the index is rebuilt after the runs that loaded new or edited ads (see macros/fts_index.sql).
+WITH job_details AS (SELECT * FROM {{ ref('src_job_details') }} WHERE {{ ingested_since_last_run() }})
+
+SELECT
+    {{ surrogate_key(['id']) }} AS job_id,
+    COALESCE (headline, 'Ingen data') AS headline,
+    COALESCE (description, 'Ingen data') AS description,
+    COALESCE (description_html_formatted, 'Ingen data') AS description_html_formatted,
+    ingestion_timestamp
+FROM job_details
+WHERE id IS NOT NULL
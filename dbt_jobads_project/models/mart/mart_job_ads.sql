@@ -0,0 +1,55 @@
+{{ config(materialized='table') }}
+
+-- One wide table with the job ads of all three occupation fields, joined once per build.
+-- The ads are deduplicated in stg_job_ads and every dimension key is unique (see schema.yml), so the joins
+-- give one row per ad.
+-- The rows are stored ordered by occupation field and publication date, so DuckDB's zone maps let queries on
+-- one field (the field marts are views over this table) or a date range skip the rest of the table.
+-- The description texts are in job_text, keyed by job_id.
+WITH  
+    fct_job_ads AS (SELECT * FROM {{ ref('fct_job_ads') }}),
+    dim_job_details AS (SELECT * FROM {{ ref('dim_job_details') }}),
+    dim_occupation AS (SELECT * FROM {{ ref('dim_occupation') }}),
+    dim_employer AS (SELECT * FROM {{ ref('dim_employer') }}),
+    dim_aux AS (SELECT * FROM {{ ref('dim_aux') }}),
+
+    joined AS (
+        SELECT
+            CAST(jd.publication_date AS DATE) AS publication_date,
+            f.job_details_id AS job_id,
+            jd.headline,
+            f.vacancies,
+            f.relevance,
+            o.occupation,
+            o.occupation_group,
+            o.occupation_field,
+            f.application_deadline,
+            jd.duration,
+            jd.salary_type,
+            e.employer_name,
+            e.employer_workplace,
+            e.workplace_region,
+            e.workplace_municipality,
+            e.workplace_city,
+            jd.employment_type,
+            jd.scope_of_work_min,
+            jd.scope_of_work_max,
+            jd.application_url,
+            a.driving_license_required,
+            a.own_car_required,
+            a.experience_required
+        FROM fct_job_ads f
+        LEFT JOIN dim_job_details jd ON f.job_details_id = jd.job_details_id
+        LEFT JOIN dim_occupation o ON f.occupation_id = o.occupation_id
+        LEFT JOIN dim_employer e ON f.employer_id = e.employer_id
+        LEFT JOIN dim_aux a ON f.auxiliary_attributes_id = a.auxiliary_attributes_id
+        WHERE o.occupation_field IN (
+            'Yrken med social inriktning',
+            'Yrken med teknisk inriktning',
+            'Chefer och verksamhetsledare'
+        )
+    )
+
+SELECT *
+FROM joined
+ORDER BY occupation_field, publication_date
@@ -0,0 +1,23 @@
+{{ config(materialized='table') }}
+
+-- Pre-aggregated counts for the dashboard's KPIs and charts: number of ads and sum of vacancies per combination
+-- of the dimensions the dashboard filters and groups on, with the publication date rolled up to the ISO week.
+-- The application deadline is kept as a date, so the dashboard can count only the ads that are still open.
+-- The widgets read a few thousand groups instead of every ad, and roll them up further in pandas.
+SELECT
+    occupation_field,
+    occupation_group,
+    occupation,
+    workplace_region,
+    workplace_municipality,
+    employment_type,
+    driving_license_required,
+    own_car_required,
+    experience_required,
+    CAST(date_trunc('week', publication_date) AS DATE) AS publication_week,
+    CAST(application_deadline AS DATE) AS application_deadline,
+    COUNT(*) AS ads,
+    CAST(SUM(vacancies) AS BIGINT) AS vacancies
+FROM {{ ref('mart_job_ads') }}
+GROUP BY ALL
+ORDER BY occupation_field, publication_week
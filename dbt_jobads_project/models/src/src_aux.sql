@@ -1,14 +1,16 @@
 -- This model extracts auxiliary job attributes from the job ads source.
 -- Boolean columns are kept in their native format; no nulls are replaced.
+-- One row per ad, so dim_aux can pick the ads ingested since its last run; dim_aux keeps the distinct combinations.
 
 with stg_job_ads as (
-    select * from {{ source('job_ads', 'stg_ads') }}
+    select * from {{ ref('stg_job_ads') }}
 )
 
-select distinct
+select
     driving_license_required,
     access_to_own_car as own_car_required,
-    experience_required
+    experience_required,
+    ingestion_timestamp
 from stg_job_ads
 
 
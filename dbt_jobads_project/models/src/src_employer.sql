@@ -1,4 +1,4 @@
-WITH stg_job_ads AS (SELECT * FROM {{ source('job_ads', 'stg_ads') }})
+WITH stg_job_ads AS (SELECT * FROM {{ ref('stg_job_ads') }})
 SELECT id, 
     employer__name as employer_name, 
     employer__workplace as employer_workplace, 
@@ -8,5 +8,6 @@ SELECT id,
     workplace_address__postcode as workplace_postcode,
     workplace_address__city as workplace_city,
     workplace_address__country as workplace_country,
-    workplace_address__municipality as workplace_municipality
+    workplace_address__municipality as workplace_municipality,
+    ingestion_timestamp
 FROM stg_job_ads
\ No newline at end of file
@@ -1,11 +1,12 @@
 
+-- stg_job_ads already holds one row per ad
 WITH stg_job_ads AS (
-    SELECT *,
-           ROW_NUMBER() OVER (
-               PARTITION BY id 
-               ORDER BY application_deadline DESC
-           ) AS rn
-    FROM {{ source('job_ads', 'stg_ads') }}
+    SELECT * FROM {{ ref('stg_job_ads') }}
+),
+
+-- Ads removed from Platsbanken, according to the JobTech stream, are left out of the facts and marts
+removed_job_ads AS (
+    SELECT id FROM {{ source('job_ads', 'stg_ads_removed') }}
 )
 
 SELECT
@@ -20,6 +21,7 @@ SELECT
     experience_required,
     employer__name,
     employer__workplace,
-    workplace_address__municipality 
+    workplace_address__municipality,
+    ingestion_timestamp
 FROM stg_job_ads
-WHERE rn = 1
\ No newline at end of file
+WHERE id NOT IN (SELECT id FROM removed_job_ads)
\ No newline at end of file
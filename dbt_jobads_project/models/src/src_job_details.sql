@@ -1,16 +1,19 @@
-WITH stg_job_ads AS (SELECT * FROM {{ source('job_ads', 'stg_ads') }})
+WITH stg_job_ads AS (SELECT * FROM {{ ref('stg_job_ads') }}),
+-- Formatted descriptions are loaded into a side table, so scans of job_ads stay small
+stg_job_ads_text AS (SELECT * FROM {{ source('job_ads', 'stg_ads_text') }})
 
 SELECT
-    id,
+    stg_job_ads.id,
     headline,
     publication_date,
     description__text AS description,
-    description__text_formatted AS description_html_formatted,
+    stg_job_ads_text.description__text_formatted AS description_html_formatted,
     employment_type__label AS employment_type,
     duration__label AS duration,
     salary_type__label AS salary_type,
     scope_of_work__min AS scope_of_work_min,
     scope_of_work__max AS scope_of_work_max,
     application_details__url AS application_url,
+    stg_job_ads.ingestion_timestamp,
 FROM stg_job_ads
-WHERE id IS NOT NULL
+LEFT JOIN stg_job_ads_text ON stg_job_ads.id = stg_job_ads_text.id
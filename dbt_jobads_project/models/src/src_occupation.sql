@@ -1,5 +1,5 @@
 -- This model is used to extract the occupation data from the job ads source table.
-with stg_job_ads as (select * from {{ source('job_ads', 'stg_ads') }}) 
+with stg_job_ads as (select * from {{ ref('stg_job_ads') }}) 
       
 -- Select the relevant columns from the source table
 -- and rename them for clarity
@@ -15,7 +15,9 @@ with stg_job_ads as (select * from {{ source('job_ads', 'stg_ads') }})
 
     occupation_field__concept_id as occupation_field_id,
     occupation_field__label as occupation_field,
-    occupation_field__legacy_ams_taxonomy_id as occupation_field_legacy_id
+    occupation_field__legacy_ams_taxonomy_id as occupation_field_legacy_id,
+
+    ingestion_timestamp
 
 from stg_job_ads
 
@@ -0,0 +1,14 @@
+{{ config(unique_key='id') }}
+
+-- The job ads of staging.job_ads, deduplicated once: one row per ad id, the latest ingestion of it.
+-- Every src_* model reads this table instead of the raw source, so the models downstream get unique ads without
+-- their own window functions, and the dimension joins cannot fan out on duplicate ads.
+-- Built incrementally like the dimensions (see macros/ingested_since_last_run.sql).
+SELECT *
+FROM {{ source('job_ads', 'stg_ads') }}
+WHERE id IS NOT NULL
+    AND {{ ingested_since_last_run() }}
+QUALIFY ROW_NUMBER() OVER (
+    PARTITION BY id
+    ORDER BY ingestion_timestamp DESC, application_deadline DESC
+) = 1
@@ -0,0 +1,41 @@
+{#
+    History (SCD2) of the job ads: a new version of an ad each time its content changes, with dbt_valid_from and
+    dbt_valid_to, e.g. for trends in revised deadlines, vacancies or occupations.
+    The loader stores an md5 content_hash per ad, so the check strategy compares that one column instead of every
+    column. Only the ads ingested since the latest snapshotted ingestion are read: the loader reloads an ad when its
+    content hash changes, whether the search or the stream API (edits to older ads) returned it, so ads that were
+    not loaded again have not changed, and the check strategy leaves ads that are missing from the input as they are.
+    Only scalar columns are kept; the texts are in job_text.
+#}
+{% snapshot job_ads_snapshot %}
+
+{{ config(
+    target_schema='snapshots',
+    unique_key='id',
+    strategy='check',
+    check_cols=['content_hash'],
+) }}
+
+{% set snapshot_relation = adapter.get_relation(database=this.database, schema=this.schema, identifier=this.identifier) %}
+
+SELECT
+    id,
+    content_hash,
+    headline,
+    publication_date,
+    application_deadline,
+    number_of_vacancies,
+    occupation__label,
+    occupation_group__label,
+    occupation_field__label,
+    employer__name,
+    workplace_address__region,
+    workplace_address__municipality,
+    employment_type__label,
+    ingestion_timestamp
+FROM {{ ref('stg_job_ads') }}
+{% if snapshot_relation is not none %}
+WHERE ingestion_timestamp >= (SELECT max(ingestion_timestamp) FROM {{ this }})
+{% endif %}
+
+{% endsnapshot %}
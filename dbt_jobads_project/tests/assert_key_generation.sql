@@ -5,7 +5,7 @@ WITH test_data AS (
         id,
         workplace_address__municipality,
         employer__workplace,
-        {{ dbt_utils.generate_surrogate_key(['employer__workplace', 'workplace_address__municipality']) }} AS expected_key
+        {{ surrogate_key(['employer__workplace', 'workplace_address__municipality']) }} AS expected_key
     FROM {{ ref('src_job_ads') }}
 ),
 -- Second CTE (dim_data):
@@ -2,7 +2,7 @@
 WITH fact_keys AS (
     SELECT
         id,
-        {{ dbt_utils.generate_surrogate_key(['employer__workplace', 'workplace_address__municipality']) }} AS expected_key
+        {{ surrogate_key(['employer__workplace', 'workplace_address__municipality']) }} AS expected_key
     FROM {{ ref('src_job_ads') }}
 ),
 -- dim_keys CTE
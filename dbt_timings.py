@@ -0,0 +1,165 @@
+"""
+Timings of the models of a dbt run, read from the run_results.json and manifest.json that dbt writes to its target directory.
+Each run is saved to the meta.dbt_model_timings table, one row per model: execution time, rows affected, bytes scanned
+(when the adapter reports it; dbt-duckdb does not), and the rows of the model and of the relations it reads after the run.
+
+A model is flagged when its execution time has grown faster than its input rows, compared with the median of its
+previous runs, e.g. a join that has started to scale worse than linearly.
+
+Usage: python dbt_timings.py [dbt target directory]   (default: dbt_jobads_project/target)
+"""
+import json
+import statistics
+import sys
+from datetime import datetime
+from pathlib import Path
+import duckdb
+
+DB_PATH = Path(__file__).parent / "jobads_data_warehouse.duckdb"
+TARGET_DIR = Path(__file__).parent / "dbt_jobads_project" / "target"
+
+# Number of previous runs of a model that its runtime and input rows are compared with.
+HISTORY_RUNS = 7
+# A model is flagged when its runtime has grown this many times more than its input rows...
+GROWTH_TOLERANCE = 1.5
+# ...and it takes at least this long, so that noise in fast models is not flagged.
+MIN_FLAGGED_SECONDS = 1.0
+
+# Reads the models of a run: (invocation_id, generated_at, [row per model]).
+# 'inputs' are the relations a model reads; ephemeral models are followed to the relations they read themselves.
+def read_run_results(target_dir=TARGET_DIR):
+    target_dir = Path(target_dir)
+    run_results = json.loads((target_dir / "run_results.json").read_text(encoding="utf-8"))
+    manifest = json.loads((target_dir / "manifest.json").read_text(encoding="utf-8"))
+    nodes = {**manifest.get("sources", {}), **manifest["nodes"]}
+
+    def inputs(unique_id):
+        relations = set()
+        for parent_id in nodes.get(unique_id, {}).get("depends_on", {}).get("nodes", []):
+            parent = nodes.get(parent_id, {})
+            if parent.get("config", {}).get("materialized") == "ephemeral":
+                relations |= inputs(parent_id)
+            elif parent.get("relation_name"):
+                relations.add(parent["relation_name"])
+        return relations
+
+    models = []
+    for result in run_results["results"]:
+        node = nodes.get(result["unique_id"], {})
+        if node.get("resource_type") != "model":
+            continue
+        timing = {step["name"]: step for step in result.get("timing", [])}
+        adapter_response = result.get("adapter_response") or {}
+        models.append({
+            "model": node["name"],
+            "status": result["status"],
+            "materialization": node.get("config", {}).get("materialized"),
+            "relation": node.get("relation_name"),
+            "inputs": sorted(inputs(result["unique_id"])),
+            "execution_seconds": result.get("execution_time", 0.0),
+            "compile_seconds": _duration(timing.get("compile")),
+            "rows_affected": adapter_response.get("rows_affected"),
+            "bytes_scanned": adapter_response.get("bytes_processed"),
+        })
+    generated_at = datetime.fromisoformat(run_results["metadata"]["generated_at"].replace("Z", "+00:00"))
+    return run_results["metadata"]["invocation_id"], generated_at, models
+
+# Seconds between the start and end of a step of a node's timing, or None.
+def _duration(step):
+    if not step or not step.get("started_at") or not step.get("completed_at"):
+        return None
+    started = datetime.fromisoformat(step["started_at"].replace("Z", "+00:00"))
+    completed = datetime.fromisoformat(step["completed_at"].replace("Z", "+00:00"))
+    return (completed - started).total_seconds()
+
+# Number of rows of a relation, or None when it cannot be counted (e.g. an ephemeral model or a failed build).
+def _row_count(con, relation):
+    if not relation:
+        return None
+    try:
+        return con.execute(f"SELECT count(*) FROM {relation}").fetchone()[0]
+    except duckdb.Error:
+        return None
+
+# True when the execution time has grown more than GROWTH_TOLERANCE times faster than the input rows since the
+# median of the model's previous runs.
+def _outpaces_rows(execution_seconds, input_rows, history):
+    if not history or execution_seconds < MIN_FLAGGED_SECONDS:
+        return False
+    previous_seconds = statistics.median(seconds for seconds, _ in history)
+    previous_rows = statistics.median(rows or 0 for _, rows in history)
+    if previous_seconds <= 0 or previous_rows <= 0 or not input_rows:
+        return False
+    return execution_seconds / previous_seconds > GROWTH_TOLERANCE * (input_rows / previous_rows)
+
+# Saves the timings of the run in 'target_dir' to meta.dbt_model_timings and returns its rows, slowest model first.
+# Saving the same run twice replaces it.
+def save_dbt_model_timings(target_dir=TARGET_DIR, db_path=DB_PATH):
+    invocation_id, generated_at, models = read_run_results(target_dir)
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE SCHEMA IF NOT EXISTS meta")
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS meta.dbt_model_timings (
+                invocation_id VARCHAR,
+                generated_at TIMESTAMPTZ,
+                model VARCHAR,
+                status VARCHAR,
+                materialization VARCHAR,
+                execution_seconds DOUBLE,
+                compile_seconds DOUBLE,
+                rows_affected BIGINT,
+                bytes_scanned BIGINT,
+                row_count BIGINT,
+                input_rows BIGINT,
+                runtime_outpaces_rows BOOLEAN
+            )
+        """)
+        con.execute("DELETE FROM meta.dbt_model_timings WHERE invocation_id = ?", [invocation_id])
+
+        row_counts = {}
+        def row_count(relation):
+            if relation not in row_counts:
+                row_counts[relation] = _row_count(con, relation)
+            return row_counts[relation]
+
+        rows = []
+        for model in models:
+            input_counts = [row_count(relation) for relation in model["inputs"]]
+            input_rows = sum(count for count in input_counts if count is not None) if model["inputs"] else None
+            history = con.execute(
+                """
+                SELECT execution_seconds, input_rows
+                FROM meta.dbt_model_timings
+                WHERE model = ? AND status = 'success'
+                ORDER BY generated_at DESC
+                LIMIT ?
+                """,
+                [model["model"], HISTORY_RUNS],
+            ).fetchall()
+            rows.append({
+                "invocation_id": invocation_id,
+                "generated_at": generated_at,
+                "model": model["model"],
+                "status": model["status"],
+                "materialization": model["materialization"],
+                "execution_seconds": model["execution_seconds"],
+                "compile_seconds": model["compile_seconds"],
+                "rows_affected": model["rows_affected"],
+                "bytes_scanned": model["bytes_scanned"],
+                "row_count": row_count(model["relation"]),
+                "input_rows": input_rows,
+                "runtime_outpaces_rows": (
+                    model["status"] == "success" and _outpaces_rows(model["execution_seconds"], input_rows, history)
+                ),
+            })
+
+        con.executemany(
+            "INSERT INTO meta.dbt_model_timings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [list(row.values()) for row in rows],
+        )
+    return sorted(rows, key=lambda row: row["execution_seconds"], reverse=True)
+
+if __name__ == "__main__":
+    for row in save_dbt_model_timings(*sys.argv[1:2]):
+        flag = "  <- runtime grows faster than input rows" if row["runtime_outpaces_rows"] else ""
+        print(f"{row['model']:<30} {row['status']:<8} {row['execution_seconds']:>8.2f} s {row['input_rows'] or 0:>12} input rows{flag}")
@@ -0,0 +1,87 @@
+"""
+Exports the marts of the DuckDB warehouse to Parquet, to be run after dbt.
+Each mart becomes a directory of Parquet files partitioned (Hive style) by occupation field and publication month:
+marts_parquet/<mart>/occupation_field=<field>/publication_month=<YYYY-MM>/data_0.parquet
+
+The dashboard can read the marts from these files instead of jobads_data_warehouse.duckdb (see load_data and load_cube
+in dashboard_app/utils.py), and any number of dashboards can read the same files. The ad texts and their full-text
+search (mart.job_text), the latest ingestion time and the pages that query the database themselves still open the
+DuckDB file, read-only.
+Every mart is written to a new directory that replaces the old one when it is complete, so a reader never sees a
+half-written export.
+
+Usage: python export_marts.py
+"""
+import os
+import shutil
+import time
+from pathlib import Path
+import duckdb
+
+DB_PATH = Path(__file__).parent / "jobads_data_warehouse.duckdb"
+EXPORT_DIR = Path(os.getenv("MARTS_PARQUET_DIR", Path(__file__).parent / "marts_parquet"))
+
+# Column of each mart that the publication month is taken from. Marts that have no occupation_field or
+# none of these columns (e.g. job_text) are not exported.
+PUBLICATION_COLUMNS = ("publication_date", "publication_week")
+
+# Returns {mart: publication column} for the tables and views in the mart schema that can be partitioned.
+def _exportable_marts(con):
+    rows = con.execute(
+        """
+        SELECT table_name, list(column_name)
+        FROM information_schema.columns
+        WHERE table_schema = 'mart'
+        GROUP BY table_name
+        ORDER BY table_name
+        """
+    ).fetchall()
+    marts = {}
+    for table_name, columns in rows:
+        publication_column = next((column for column in PUBLICATION_COLUMNS if column in columns), None)
+        if "occupation_field" in columns and publication_column:
+            marts[table_name] = publication_column
+    return marts
+
+# Writes one mart to a temporary directory next to its export and then swaps the directories.
+# The rows are sorted on the publication date within each file, so the row group statistics let DuckDB and
+# pyarrow skip the row groups outside a date filter as well.
+def _export_mart(con, mart, publication_column, export_dir):
+    target = export_dir / mart
+    staging = export_dir / f".{mart}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+
+    con.execute(
+        f"""
+        COPY (
+            SELECT *, strftime({publication_column}, '%Y-%m') AS publication_month
+            FROM mart.{mart}
+            ORDER BY occupation_field, {publication_column}
+        )
+        TO '{staging}' (FORMAT PARQUET, PARTITION_BY (occupation_field, publication_month), COMPRESSION ZSTD)
+        """
+    )
+
+    previous = export_dir / f".{mart}.old"
+    shutil.rmtree(previous, ignore_errors=True)
+    if target.exists():
+        target.rename(previous)
+    staging.rename(target)
+    shutil.rmtree(previous, ignore_errors=True)
+    return sum(1 for _ in target.rglob("*.parquet"))
+
+# Exports every mart and returns {mart: number of Parquet files}.
+def export_marts(db_path=DB_PATH, export_dir=EXPORT_DIR):
+    export_dir = Path(export_dir)
+    export_dir.mkdir(parents=True, exist_ok=True)
+
+    files = {}
+    with duckdb.connect(str(db_path), read_only=True) as con:
+        for mart, publication_column in _exportable_marts(con).items():
+            start = time.perf_counter()
+            files[mart] = _export_mart(con, mart, publication_column, export_dir)
+            print(f"Exported mart.{mart} to {export_dir / mart} ({files[mart]} files, {time.perf_counter() - start:.1f} s)")
+    return files
+
+if __name__ == "__main__":
+    export_marts()
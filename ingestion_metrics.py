@@ -0,0 +1,85 @@
+"""
+Telemetry for runs of load_job_ads.py: request latency, response sizes, hits per page, duplicates and stage durations.
+The metrics are collected in memory during a run (requests are recorded from several threads) and saved to the
+meta.ingestion_metrics table in DuckDB afterwards, one row per run, occupation field and metric.
+"""
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+# Upper bounds in seconds of the request latency histogram. Slower requests are counted in a last, open bucket.
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+# Collects the metrics of one ingestion run.
+# Requests are recorded per occupation field; 'count' requests only ask for totals while planning the shards,
+# 'page' requests fetch the ads themselves. Stage durations and other run-wide values are recorded with record_run.
+class IngestionMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(list)
+        self._fields = defaultdict(lambda: defaultdict(float))
+        self._run = {}
+
+    def record_request(self, occupation_field, kind, latency, response_bytes, hits):
+        with self._lock:
+            self._latencies[occupation_field].append(latency)
+            field = self._fields[occupation_field]
+            field["requests"] += 1
+            field[f"{kind}_requests"] += 1
+            field["response_bytes"] += response_bytes
+            if kind == "page":
+                field["hits"] += hits
+
+    def record_field(self, occupation_field, **values):
+        with self._lock:
+            self._fields[occupation_field].update(values)
+
+    def record_run(self, **values):
+        with self._lock:
+            self._run.update(values)
+
+    # Returns {"run": {metric: value}, "occupation_fields": {occupation field: {metric: value}}}.
+    # The run metrics include the totals of all occupation fields.
+    def summary(self):
+        with self._lock:
+            occupation_fields = {
+                occupation_field: dict(values, **_latency_metrics(self._latencies[occupation_field]))
+                for occupation_field, values in self._fields.items()
+            }
+            for values in occupation_fields.values():
+                if values.get("page_requests"):
+                    values["hits_per_page"] = values["hits"] / values["page_requests"]
+
+            run = dict(self._run)
+            for metric in ("requests", "page_requests", "count_requests", "response_bytes", "hits", "ads",
+                           "duplicates_skipped", "new", "changed", "unchanged"):
+                run[metric] = sum(values.get(metric, 0) for values in occupation_fields.values())
+            run.update(_latency_metrics([latency for latencies in self._latencies.values() for latency in latencies]))
+        return {"run": run, "occupation_fields": occupation_fields}
+
+    # Rows for meta.ingestion_metrics: (run_started, occupation_field, metric, value).
+    # Run-wide metrics have no occupation field.
+    def rows(self, run_started):
+        summary = self.summary()
+        rows = [(run_started, None, metric, float(value)) for metric, value in summary["run"].items()]
+        for occupation_field, values in summary["occupation_fields"].items():
+            rows.extend((run_started, occupation_field, metric, float(value)) for metric, value in values.items())
+        return rows
+
+# Percentiles and a histogram of request latencies.
+def _latency_metrics(latencies):
+    if not latencies:
+        return {}
+    latencies = sorted(latencies)
+    metrics = {
+        "latency_p50_seconds": latencies[len(latencies) // 2],
+        "latency_p95_seconds": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "latency_max_seconds": latencies[-1],
+    }
+    histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+    for latency in latencies:
+        histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+    for upper_bound, count in zip(LATENCY_BUCKETS, histogram):
+        metrics[f"latency_le_{upper_bound}s"] = count
+    metrics[f"latency_gt_{LATENCY_BUCKETS[-1]}s"] = histogram[-1]
+    return metrics
@@ -1,93 +1,1194 @@
 """
 This script loads data (job ads) from the JobTech API into a DLT pipeline, and saves the ads into a DuckDB database.
 It handles API-pagination, filters results by specified occupation fields, and organizes the data under a staging dataset.
+Pages are fetched concurrently over a shared keep-alive connection pool, but ads are always yielded in page order.
 """
 import dlt
-import requests
+from dlt.common.pipeline import get_dlt_pipelines_dir
+import pyarrow as pa
+import pyarrow.compute as pc
+from requests.adapters import HTTPAdapter
 import json
+import gzip
+import hashlib
+import io
+import re
+import shutil
+import zipfile
+import threading
+import sys
+import zstandard
 from pathlib import Path
 import os
+import time
 import duckdb
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from itertools import islice
+from api_throttling import ThrottledSession
+from ingestion_metrics import IngestionMetrics
 
-# Function to fetch distinct IDs from the DuckDB database.
-# This is used to avoid duplicate entries when loading data.
-def get_existing_ids():
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# The JobTech API, or a local stand-in such as benchmarks/mock_jobtech_api.py (set JOBTECH_API_URL=http://127.0.0.1:8000).
+JOBTECH_API_URL = os.getenv("JOBTECH_API_URL", "https://jobsearch.api.jobtechdev.se")
+URL_FOR_SEARCH = f"{JOBTECH_API_URL.rstrip('/')}/search"
+
+# The JobTech stream API, which reports the ads that have been published, edited or removed (or the same local
+# stand-in, set JOBSTREAM_API_URL=http://127.0.0.1:8000).
+JOBSTREAM_API_URL = os.getenv("JOBSTREAM_API_URL", "https://jobstream.api.jobtechdev.se")
+URL_FOR_STREAM = f"{JOBSTREAM_API_URL.rstrip('/')}/stream"
+
+# The stream is read since the latest event loaded, which is saved with the watermarks under this key (named after
+# the removals, which were the only events read at first), in UTC. The first run looks back STREAM_INITIAL_LOOKBACK.
+STREAM_WATERMARK = "removed_ads"
+STREAM_INITIAL_LOOKBACK = timedelta(days=1)
+
+# Hits per page. 100 is the largest page the search API allows.
+PAGE_SIZE = 100
+
+# Maximum number of HTTP requests in flight at the same time (shared by all occupation fields).
+# The actual number adapts to the API between 1 and this maximum.
+MAX_CONCURRENT_REQUESTS = 8
+
+# Limits for requests against the API: average requests per second, (connect, read) timeout in seconds,
+# retries per request and retries per run.
+REQUESTS_PER_SECOND = 20
+REQUEST_TIMEOUT = (5, 30)
+MAX_RETRIES = 5
+RETRY_BUDGET = 100
+
+# The largest offset the JobTech search API accepts.
+MAX_OFFSET = 2000
+
+# How far before the saved watermark the next incremental run starts searching.
+# Ads are sometimes indexed a while after their publication date, so a small look-back avoids missing them.
+WATERMARK_OVERLAP = timedelta(hours=1)
+
+# Searches with more hits than the offset ceiling are split along these dimensions, in order, before
+# falling back to publication-date windows. SHARD_STATS_LIMIT is the number of values counted per dimension.
+SHARD_DIMENSIONS = ("occupation-group", "region", "municipality")
+SHARD_STATS_LIMIT = 500
+
+# Number of shards per occupation field that are downloaded ahead of the DLT pipeline.
+MAX_PREFETCHED_SHARDS = 4
+
+# The database and the landing zone are next to this script, like in export_marts.py, dbt_timings.py and the
+# dashboard, so every process uses the same files whatever directory it is started from.
+DB_PATH = str(Path(__file__).parent / "jobads_data_warehouse.duckdb")
+# Lock file next to the database, see duckdb_lock.
+DB_LOCK_PATH = f"{DB_PATH}.lock"
+
+# Raw API responses are kept here, partitioned by run and occupation field (see _land_pages).
+LANDING_DIR = Path(__file__).parent / "landing" / "job_ads"
+RUN_ID_FORMAT = "%Y%m%dT%H%M%S"
+PAGES_PER_LANDING_FILE = 50
+
+# Historical dumps (see import_pipeline) are split into batches of IMPORT_BATCH_SIZE ads for the process pool.
+# A dump that is one large JSON array is read DUMP_READ_SIZE characters at a time.
+IMPORT_BATCH_SIZE = 2000
+DUMP_READ_SIZE = 1 << 20
+
+# Columns of the job ads table: the fields the dbt models read, and the fields the loader itself needs.
+# All other fields of a hit, including nested lists, are dropped before normalization (see _rows_to_arrow).
+# Pass columns=None to jobsearch_resource to keep every field. A column added here is filled from the next run on,
+# or for all ads by a replay of the landing zone.
+STAGING_COLUMNS = (
+    "id", "headline", "publication_date", "application_deadline", "last_publication_date", "removed", "removed_date",
+    "number_of_vacancies", "relevance", "driving_license_required", "access_to_own_car", "experience_required",
+    "description__text", "description__text_formatted",
+    "employer__name", "employer__workplace", "employer__organization_number",
+    "workplace_address__street_address", "workplace_address__postcode", "workplace_address__city",
+    "workplace_address__municipality", "workplace_address__region", "workplace_address__country",
+    "occupation__concept_id", "occupation__label", "occupation__legacy_ams_taxonomy_id",
+    "occupation_group__concept_id", "occupation_group__label", "occupation_group__legacy_ams_taxonomy_id",
+    "occupation_field__concept_id", "occupation_field__label", "occupation_field__legacy_ams_taxonomy_id",
+    "employment_type__label", "duration__label", "salary_type__label", "scope_of_work__min", "scope_of_work__max",
+    "application_details__url", "content_hash", "ingestion_timestamp",
+)
+
+# Large text columns that are only shown for a single ad. When the resource is given a 'text_table', they are
+# written to that table (keyed by id) instead of the job ads table, which keeps scans of the job ads table cheap.
+TEXT_COLUMNS = ("description__text_formatted",)
+
+# Fields that are left out of the content hash of an ad (see _content_hash). The relevance depends on the search,
+# not on the ad, so it would make every ad look changed.
+UNHASHED_COLUMNS = ("relevance", "content_hash", "ingestion_timestamp")
+
+# Fields of a job ad that hold ISO timestamps. They are parsed into Arrow timestamps (see _rows_to_arrow).
+TIMESTAMP_COLUMNS = ("publication_date", "application_deadline", "last_publication_date", "removed_date", "ingestion_timestamp")
+
+# Arrow type of each of the STAGING_COLUMNS, so every page has the same schema whatever the values on it,
+# e.g. a relevance of 1 on one page and of 0.5 on the next (see _rows_to_arrow). Columns not listed are strings.
+STAGING_TYPES = dict(
+    {name: pa.string() for name in STAGING_COLUMNS},
+    number_of_vacancies=pa.int64(),
+    relevance=pa.float64(),
+    scope_of_work__min=pa.int64(),
+    scope_of_work__max=pa.int64(),
+    removed=pa.bool_(),
+    driving_license_required=pa.bool_(),
+    access_to_own_car=pa.bool_(),
+    experience_required=pa.bool_(),
+    **{name: pa.timestamp("us", tz="UTC") for name in TIMESTAMP_COLUMNS},
+)
+
+# Serializes access to the DuckDB file between processes, e.g. partitions loaded in parallel by Dagster.
+# DuckDB allows one process to write to the file, and no other process to read it meanwhile. Reads take a shared lock,
+# so several runs can look up content hashes at the same time, and writes take an exclusive lock.
+# Windows has no shared file locks, so there every access is exclusive.
+@contextmanager
+def duckdb_lock(shared=False):
+    with open(DB_LOCK_PATH, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+# Function to fetch the saved high-water mark (latest publication date loaded) per occupation field.
+# Returns an empty dict on the first run, before the watermark table exists.
+def get_watermarks():
     try:
-        con = duckdb.connect("jobads_data_warehouse.duckdb")
-        result = con.execute("SELECT DISTINCT id FROM staging.job_ads").fetchall()
-        con.close()
-        return {row[0] for row in result}
+        with duckdb_lock(shared=True), duckdb.connect(DB_PATH, read_only=True) as con:
+            result = con.execute(
+                "SELECT occupation_field, last_publication_date FROM meta.ingestion_watermarks"
+            ).fetchall()
+        return {occupation_field: last_publication_date for occupation_field, last_publication_date in result}
     except Exception as e:
-        print(f"Error fetching existing IDs: {e}")
-        return set()
+        print(f"Error fetching watermarks: {e}")
+        return {}
+
+# Saves the high-water mark for an occupation field, once its ads have been loaded.
+def save_watermark(occupation_field, last_publication_date):
+    with duckdb.connect(DB_PATH) as con:
+        con.execute("CREATE SCHEMA IF NOT EXISTS meta")
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS meta.ingestion_watermarks (
+                occupation_field VARCHAR PRIMARY KEY,
+                last_publication_date TIMESTAMP,
+                updated_at TIMESTAMP
+            )
+        """)
+        con.execute(
+            "INSERT OR REPLACE INTO meta.ingestion_watermarks VALUES (?, ?, now())",
+            [occupation_field, last_publication_date],
+        )
+
+# Saves the metrics of a run (see ingestion_metrics.py), one row per occupation field and metric.
+def save_ingestion_metrics(run_started, metrics):
+    with duckdb.connect(DB_PATH) as con:
+        con.execute("CREATE SCHEMA IF NOT EXISTS meta")
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS meta.ingestion_metrics (
+                run_started TIMESTAMP,
+                occupation_field VARCHAR,
+                metric VARCHAR,
+                value DOUBLE
+            )
+        """)
+        con.executemany("INSERT INTO meta.ingestion_metrics VALUES (?, ?, ?, ?)", metrics.rows(run_started))
+
+# Creates a requests session with a keep-alive connection pool large enough for the concurrency limit.
+# Reusing the session avoids a new TCP/TLS handshake for every page.
+# The session also rate limits and retries requests, and adapts the number of requests in flight
+# (up to max_concurrent_requests) to how fast the API answers (see api_throttling.py).
+# Every request made through the session is recorded in 'metrics'.
+def create_session(max_concurrent_requests=MAX_CONCURRENT_REQUESTS, metrics=None):
+    session = ThrottledSession(
+        max_concurrent_requests,
+        requests_per_second=REQUESTS_PER_SECOND,
+        timeout=REQUEST_TIMEOUT,
+        max_retries=MAX_RETRIES,
+        retry_budget=RETRY_BUDGET,
+    )
+    session.headers.update({"accept": "application/json"})
+    session.metrics = metrics if metrics is not None else IngestionMetrics()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrent_requests)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 # Sends a GET-request to the URL, with specified parameters and headers.
-# Raises an exception if the request fails.
+# Raises an exception if the request still fails after the retries of the session.
 # Returns the response content, decoded from JSON, into a Python dictionary.
-def _get_ads(url_for_search, params):
-    headers = {"accept": "application/json"}
-    response = requests.get(url_for_search, headers=headers, params=params)
-    response.raise_for_status()  
+# The latency of the API (of the last attempt, without time spent waiting for the rate limit), the response size
+# and the number of hits are recorded in the metrics of the session. Requests with a limit of at most one
+# only count hits while planning shards, so they are recorded as 'count' requests.
+def _get_ads(session, url_for_search, params):
+    response = session.get(url_for_search, params=params)
+    response.raise_for_status()
+    data = json.loads(response.content.decode("utf8"))
+    session.metrics.record_request(
+        params.get("occupation-field"),
+        "count" if params.get("limit", 100) <= 1 else "page",
+        response.elapsed.total_seconds(),
+        len(response.content),
+        len(data.get("hits", [])),
+    )
+    return data
+
+# Fetches the events of the stream API since a date, for the given occupation fields.
+# The stream returns a JSON list of ads that have changed; removed ads have 'removed' set and a 'removed_date'.
+def _get_stream(session, since, occupation_fields):
+    params = {"date": since, "occupation-concept-id": list(occupation_fields)}
+    response = session.get(URL_FOR_STREAM, params=params)
+    response.raise_for_status()
     return json.loads(response.content.decode("utf8"))
 
-# Loads data (job ads) from the specified URL into a DLT-pipeline.
-# The function is a DLT resource, which means it can be used to load data into a DLT pipeline.
-@dlt.resource(write_disposition="append")
-def jobsearch_resource(params, existing_ids):
-    # Set up API URL and pagination parameters: 'limit' defines page size, 'offset' defines starting point.
-    url = "https://jobsearch.api.jobtechdev.se"
-    url_for_search = f"{url}/search"
+# Submits the remaining pages of a search window once its first page is known.
+# The total number of hits in the first page decides how many pages are requested, capped at MAX_OFFSET.
+# Returns a list of futures in offset order, starting with the first page.
+def _submit_remaining_pages(executor, session, params, first_page):
     limit = params.get("limit", 100)
-    offset = 0
+    data = first_page.result()
+    total = data.get("total", {}).get("value", 0)
+
+    futures = [first_page]
+    if len(data.get("hits", [])) < limit:
+        return futures
 
-    while True:        
+    for offset in range(limit, min(total, MAX_OFFSET + 1), limit):
         page_params = dict(params, offset=offset)
-        data = _get_ads(url_for_search, page_params)
+        futures.append(executor.submit(_get_ads, session, URL_FOR_SEARCH, page_params))
+    return futures
 
-        # Get list of job ads from response.
-        hits = data.get("hits", [])
-        if not hits:            
+# Submits the first page of a search window without waiting for it.
+# When the first page arrives, the rest of the window is submitted from the callback.
+# Returns a future that resolves to the list of page futures of the window.
+def _submit_window(executor, session, params):
+    window = Future()
+    first_page = executor.submit(_get_ads, session, URL_FOR_SEARCH, dict(params, offset=0))
+
+    def submit_remaining_pages(first_page):
+        try:
+            window.set_result(_submit_remaining_pages(executor, session, params, first_page))
+        except Exception as e:
+            window.set_exception(e)
+
+    first_page.add_done_callback(submit_remaining_pages)
+    return window
+
+# Formats a timestamp for the 'published-after' parameter.
+# The overlap moves the boundary back a little, since ads published at the boundary itself may not have been seen yet.
+# Ads that are fetched twice because of the overlap are dropped by the duplicate check.
+def _published_after(timestamp, overlap=WATERMARK_OVERLAP):
+    return (timestamp - overlap).strftime("%Y-%m-%dT%H:%M:%S")
+
+# Yields the page futures of a search, window by window.
+# Searches are sorted by publication date, so when a window is cut off at MAX_OFFSET the next window
+# starts at the publication date of the last ad seen. This pages past the offset ceiling instead of dropping ads.
+def _search_windows(executor, session, params, first_window):
+    window = first_window
+    while True:
+        yield from window
+
+        last_page = window[-1].result()
+        last_offset = (len(window) - 1) * params.get("limit", 100)
+        total = last_page.get("total", {}).get("value", 0)
+        hits = last_page.get("hits", [])
+        if not hits or last_offset + len(hits) >= total:
+            break
+
+        next_published_after = ""
+        if hits[-1].get("publication_date"):
+            last_publication_date = datetime.fromisoformat(hits[-1]["publication_date"])
+            next_published_after = _published_after(last_publication_date, overlap=timedelta(seconds=1))
+        if next_published_after <= params.get("published-after", ""):
+            # The window cannot move forward, e.g. when more than MAX_OFFSET ads share the same publication second.
+            print(f"Search window stuck after offset {last_offset}, {total - last_offset - len(hits)} ads skipped")
             break
 
-        # Yield each ad from the current page and check if ad already exists in the database.
-        for ad in hits:
+        params = dict(params, **{"published-after": next_published_after})
+        window = _submit_window(executor, session, params).result()
+
+# Parameters for a request that only counts the hits of a search, optionally with counts per value of a dimension.
+def _count_params(params, dimension=None):
+    count_params = dict(params, limit=0, offset=0)
+    if dimension is not None:
+        count_params.update({"stats": dimension, "stats.limit": SHARD_STATS_LIMIT})
+    return count_params
+
+# Splits a search into one shard per value of a dimension, using the counts from the 'stats' of the response.
+# Returns a list of (shard params, hit count), or None if the values do not add up to the total
+# (for example ads without a region), since the shards would then miss some ads.
+def _split_by_dimension(params, dimension, data):
+    total = data.get("total", {}).get("value", 0)
+    values = [
+        value
+        for stats in data.get("stats", [])
+        if stats.get("type") == dimension
+        for value in stats.get("values", [])
+    ]
+    if len(values) < 2 or sum(value["count"] for value in values) != total:
+        return None
+    return [(dict(params, **{dimension: value["concept_id"]}), value["count"]) for value in values]
+
+# Splits a search into two publication-date windows.
+# The windows overlap by a second, so ads on the boundary end up in at least one of them.
+# Returns None when the window is too narrow to split.
+def _split_by_date(session, params):
+    if "published-after" in params:
+        lower = datetime.fromisoformat(params["published-after"])
+    else:
+        earliest = _get_ads(session, URL_FOR_SEARCH, dict(params, limit=1, offset=0, sort="pubdate-asc"))
+        lower = datetime.fromisoformat(earliest["hits"][0]["publication_date"]) - timedelta(seconds=1)
+    if "published-before" in params:
+        upper = datetime.fromisoformat(params["published-before"])
+    else:
+        upper = datetime.now()
+
+    if upper - lower <= timedelta(seconds=4):
+        return None
+    middle = lower + (upper - lower) / 2
+    return [
+        dict(params, **{
+            "published-after": lower.strftime("%Y-%m-%dT%H:%M:%S"),
+            "published-before": (middle + timedelta(seconds=1)).strftime("%Y-%m-%dT%H:%M:%S"),
+        }),
+        dict(params, **{
+            "published-after": (middle - timedelta(seconds=1)).strftime("%Y-%m-%dT%H:%M:%S"),
+            "published-before": upper.strftime("%Y-%m-%dT%H:%M:%S"),
+        }),
+    ]
+
+# Splits each search into shards that fit under the offset ceiling of the search API.
+# A search that is too large is split by occupation group, then region, then municipality, and finally by
+# publication-date window. The counts for all searches on the same level are requested in parallel.
+# Returns one list of shard params per search, in the same order as params_list.
+def plan_shards(executor, session, params_list, shard_size=MAX_OFFSET):
+    shards = [[] for _ in params_list]
+    pending = [(index, params, 0) for index, params in enumerate(params_list)]
+
+    while pending:
+        counts = [
+            executor.submit(_get_ads, session, URL_FOR_SEARCH, _count_params(params, SHARD_DIMENSIONS[level]))
+            if level < len(SHARD_DIMENSIONS)
+            else executor.submit(_get_ads, session, URL_FOR_SEARCH, _count_params(params))
+            for index, params, level in pending
+        ]
+
+        next_pending = []
+        for (index, params, level), count in zip(pending, counts):
+            data = count.result()
+            total = data.get("total", {}).get("value", 0)
+            if total <= shard_size:
+                if total > 0:
+                    shards[index].append(params)
+                continue
+
+            if level < len(SHARD_DIMENSIONS):
+                children = _split_by_dimension(params, SHARD_DIMENSIONS[level], data)
+                if children is None:
+                    next_pending.append((index, params, level + 1))
+                    continue
+                for child_params, child_total in children:
+                    if child_total <= shard_size:
+                        shards[index].append(child_params)
+                    else:
+                        next_pending.append((index, child_params, level + 1))
+            else:
+                windows = _split_by_date(session, params)
+                if windows is None:
+                    # Paging by publication date in _search_windows still continues past the ceiling.
+                    shards[index].append(params)
+                else:
+                    next_pending.extend((index, window, level) for window in windows)
+
+        pending = next_pending
+
+    return shards
+
+# Yields the page futures of every shard of a search, shard by shard.
+# Up to MAX_PREFETCHED_SHARDS shards are downloaded ahead of the consumer, which keeps the pool busy
+# while limiting how many pages wait in memory.
+def _shard_pages(executor, session, shards, in_flight):
+    while in_flight:
+        params, window = in_flight.popleft()
+        for next_params in islice(shards, 1):
+            in_flight.append((next_params, _submit_window(executor, session, next_params)))
+        yield from _search_windows(executor, session, params, window.result())
+
+# Submits the pages of the shards of each search.
+# The first shards of all searches are requested right away, so occupation fields are fetched in parallel.
+# Returns one iterator of page futures per search, in the same order as shards_list.
+def submit_searches(executor, session, shards_list):
+    searches = []
+    for shards in shards_list:
+        shards = (dict(params, sort="pubdate-asc") for params in shards)
+        in_flight = deque(
+            (params, _submit_window(executor, session, params))
+            for params in islice(shards, MAX_PREFETCHED_SHARDS)
+        )
+        searches.append(_shard_pages(executor, session, shards, in_flight))
+    return searches
+
+# Writes each page to the raw landing zone before passing it on.
+# Pages are stored as zstd-compressed JSON lines, PAGES_PER_LANDING_FILE pages per file, so a replay
+# can decompress the files in parallel. Files are only ever added, never rewritten.
+def _land_pages(pages, landing_dir):
+    landing_dir.mkdir(parents=True, exist_ok=True)
+    compressor = zstandard.ZstdCompressor()
+    landing_file = None
+    writer = None
+    try:
+        for number, page in enumerate(pages):
+            if number % PAGES_PER_LANDING_FILE == 0:
+                if writer:
+                    writer.close()
+                landing_file = open(landing_dir / f"part-{number // PAGES_PER_LANDING_FILE:05d}.jsonl.zst", "xb")
+                writer = compressor.stream_writer(landing_file)
+            writer.write(json.dumps(page, ensure_ascii=False).encode("utf8") + b"\n")
+            yield page
+    finally:
+        if writer:
+            writer.close()
+
+# Reads all pages from one landing file. Runs in a worker process during a replay.
+def _read_landing_file(path):
+    with open(path, "rb") as landing_file:
+        with zstandard.ZstdDecompressor().stream_reader(landing_file) as reader:
+            return [json.loads(line) for line in io.TextIOWrapper(reader, encoding="utf8")]
+
+# Finds the landing files of an occupation field, grouped by run in chronological order.
+# Returns a list of (ingestion timestamp of the run, list of files).
+def _landing_runs(landing_root, occupation_field):
+    runs = []
+    for run_dir in sorted(Path(landing_root).glob("run_id=*")):
+        files = sorted((run_dir / f"occupation_field={occupation_field}").rglob("part-*.jsonl.zst"))
+        if files:
+            run_started = datetime.strptime(run_dir.name.removeprefix("run_id="), RUN_ID_FORMAT)
+            runs.append((run_started.isoformat(), files))
+    return runs
+
+# Content hashes of the job ads that are already loaded, looked up one page at a time.
+# With a 'table', stored hashes are read from that DuckDB table; hashes recorded during the run are kept in memory
+# and take precedence. Without a table (e.g. during a replay, where the table has just been emptied), only the
+# hashes recorded during the run are known.
+# Each lookup opens its own read-only connection under a shared duckdb_lock, so the lock is only held while a page
+# is looked up and not while the pages are fetched, and parallel partitions can load in between.
+class ContentHashes:
+    def __init__(self, table=None):
+        self.table = table
+        self._recorded = {}
+        self._lock = threading.Lock()
+
+    # Returns {id: content hash} for the ads of a page (flattened rows) that are known. New ads are left out.
+    # The lookup is limited to the publication dates of the page, which lets DuckDB skip most of the table,
+    # since ads are stored roughly in the order they were published.
+    def get(self, rows):
+        ids = [row["id"] for row in rows]
+        stored = {}
+        # On the first run there is no database yet: every ad counts as new.
+        if self.table is not None and Path(DB_PATH).exists():
+            query = f"SELECT id, content_hash FROM {self.table} WHERE id IN (SELECT unnest(?))"
+            parameters = [ids]
+            publication_dates = [row.get("publication_date") for row in rows]
+            if all(publication_dates):
+                publication_dates = [
+                    _utc(value if isinstance(value, datetime) else datetime.fromisoformat(value))
+                    for value in publication_dates
+                ]
+                query += " AND publication_date BETWEEN ? AND ?"
+                parameters += [min(publication_dates), max(publication_dates)]
+            try:
+                with duckdb_lock(shared=True), duckdb.connect(DB_PATH, read_only=True) as con:
+                    stored = dict(con.execute(query, parameters).fetchall())
+            except (duckdb.CatalogException, duckdb.BinderException):
+                # The first run of a table, or a table loaded before content hashes were added: every ad counts as new.
+                pass
+        with self._lock:
+            stored.update((ad_id, self._recorded[ad_id]) for ad_id in ids if ad_id in self._recorded)
+        return stored
+
+    def record(self, hashes):
+        with self._lock:
+            self._recorded.update(hashes)
+
+# Loads data (job ads) from the JobTech API into a DLT-pipeline.
+# The function is a DLT resource, which means it can be used to load data into a DLT pipeline.
+# If 'pages' (page futures from submit_searches) is given, the pages are already being fetched;
+# otherwise the resource fetches its own pages with a private session and thread pool.
+# If 'progress' is given, the latest publication date seen is recorded in it, to be saved as the new watermark,
+# together with the number of ads and of duplicates skipped.
+# If 'landing_dir' is given, the raw pages are also written to the landing zone.
+# All ads get the same 'ingestion_timestamp', by default the time the resource starts.
+# Only the fields in 'columns' are kept. If 'text_table' is given, the TEXT_COLUMNS go to that table instead.
+# Every ad gets a 'content_hash'. If 'content_hashes' (see ContentHashes) is given, ads whose hash has not changed
+# since they were loaded are skipped, so only new and changed ads reach the table and the dbt models downstream.
+# If 'history_table' is given, a row per new or changed ad is appended to that table.
+# Ads are merged on 'id', so DuckDB replaces ads that are already loaded instead of the loader keeping every
+# loaded ID in memory. When the same ad is loaded more than once in a load, the latest ingestion is kept.
+# The resource yields one Arrow table per page and is parallelized, so several occupation fields are
+# extracted at the same time within one pipeline run.
+@dlt.resource(write_disposition="merge", primary_key="id", columns={"ingestion_timestamp": {"dedup_sort": "desc"}},
+              parallelized=True)
+def jobsearch_resource(params, pages=None, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, progress=None, landing_dir=None,
+                       ingestion_timestamp=None, columns=STAGING_COLUMNS, text_table=None, content_hashes=None,
+                       history_table=None):
+    if progress is None:
+        progress = {}
+    if ingestion_timestamp is None:
+        ingestion_timestamp = datetime.now().isoformat()
+    if pages is None:
+        with create_session(max_concurrent_requests) as session, \
+                ThreadPoolExecutor(max_workers=max_concurrent_requests) as executor:
+            [shards] = plan_shards(executor, session, [params])
+            [pages] = submit_searches(executor, session, [shards])
+            yield from _yield_ad_tables(_page_results(pages, landing_dir), progress, ingestion_timestamp, columns, text_table,
+                                        content_hashes, history_table)
+    else:
+        yield from _yield_ad_tables(_page_results(pages, landing_dir), progress, ingestion_timestamp, columns, text_table,
+                                    content_hashes, history_table)
+
+# Waits for the page futures in order, which keeps the output deterministic even though pages complete out of order.
+def _page_results(pages, landing_dir):
+    page_results = (page.result() for page in pages)
+    if landing_dir is not None:
+        page_results = _land_pages(page_results, landing_dir)
+    return page_results
+
+# Rebuilds job ads from the raw landing zone instead of the JobTech API.
+# Every run of the occupation field is replayed in chronological order, with the ingestion timestamp of that run.
+# The landing files are decompressed and parsed in a process pool.
+# 'columns', 'text_table' and 'history_table' work as in jobsearch_resource. The content hashes are tracked
+# across the replayed runs, so each run only yields the ads that were new or changed in it, and the history
+# table is rebuilt with the same rows.
+@dlt.resource(write_disposition="merge", primary_key="id", columns={"ingestion_timestamp": {"dedup_sort": "desc"}},
+              parallelized=True)
+def landing_replay_resource(occupation_field, landing_root=LANDING_DIR, columns=STAGING_COLUMNS, text_table=None,
+                            history_table=None):
+    content_hashes = ContentHashes()
+    with ProcessPoolExecutor() as executor:
+        for ingestion_timestamp, files in _landing_runs(landing_root, occupation_field):
+            pages = (page for file_pages in executor.map(_read_landing_file, files) for page in file_pages)
+            yield from _yield_ad_tables(pages, {}, ingestion_timestamp, columns, text_table, content_hashes, history_table)
+
+# Returns the time to read the stream API since: the saved stream watermark, or STREAM_INITIAL_LOOKBACK ago.
+def _stream_since(watermarks):
+    if STREAM_WATERMARK in watermarks:
+        return _utc(watermarks[STREAM_WATERMARK])
+    return datetime.now(timezone.utc) - STREAM_INITIAL_LOOKBACK
+
+# Fetches the events of the stream API since 'since' (a UTC timestamp). The time of the latest event is recorded in
+# 'progress' (in UTC), to be saved as the watermark of the next run. Removals have a 'removed_date' (in UTC unless
+# it says otherwise); the other events are ads that were published or edited, with the time of the change in
+# 'timestamp' (milliseconds since the epoch).
+def _stream_events(session, since, occupation_fields, progress):
+    events = _get_stream(session, _published_after(since), occupation_fields)
+    for event in events:
+        if event.get("removed") and event.get("removed_date"):
+            event_date = _utc(datetime.fromisoformat(event["removed_date"]))
+        elif not event.get("removed") and event.get("timestamp"):
+            event_date = datetime.fromtimestamp(event["timestamp"] / 1000, tz=timezone.utc)
+        else:
+            continue
+        if "last_event_date" not in progress or event_date > progress["last_event_date"]:
+            progress["last_event_date"] = event_date
+    return events
+
+# Loads the removed ads among the 'events' of the stream API (see _stream_events), one row per ad.
+# Removed ads are merged on 'id', so an ad that is reported again keeps a single row.
+# The columns are declared and the table is created without rows when there are no removals, so the table
+# exists for the dbt models even before the first removal is loaded.
+@dlt.resource(write_disposition="merge", primary_key="id", columns={
+    "id": {"data_type": "text", "nullable": False},
+    "removed_date": {"data_type": "timestamp"},
+    "ingestion_timestamp": {"data_type": "timestamp", "dedup_sort": "desc"},
+})
+def removed_ads_resource(events, progress=None, ingestion_timestamp=None):
+    if progress is None:
+        progress = {}
+    if ingestion_timestamp is None:
+        ingestion_timestamp = datetime.now().isoformat()
+
+    removed_ads = [
+        {"id": event["id"], "removed_date": event.get("removed_date"), "ingestion_timestamp": ingestion_timestamp}
+        for event in events
+        if event.get("removed") and event.get("id")
+    ]
+    progress["removed_ads"] = len(removed_ads)
+    if removed_ads:
+        yield removed_ads
+    else:
+        yield dlt.mark.materialize_table_schema()
+
+# Loads the ads among the 'events' of the stream API that were published or edited (see _stream_events).
+# The search only returns ads published since the watermark, so an edit to an older ad is only seen here.
+# The events are whole ads, which go through the same content hash check as the pages of jobsearch_resource:
+# 'columns', 'text_table', 'content_hashes' and 'history_table' work as there, and the number of new, changed and
+# unchanged ads is kept in 'progress'. If 'landing_run_dir' is given, the ads are landed per occupation field in
+# a 'stream' directory of that run, so a replay of the landing zone applies the edits as well.
+@dlt.resource(write_disposition="merge", primary_key="id", columns={"ingestion_timestamp": {"dedup_sort": "desc"}})
+def updated_ads_resource(events, progress=None, landing_run_dir=None, ingestion_timestamp=None, columns=STAGING_COLUMNS,
+                         text_table=None, content_hashes=None, history_table=None):
+    if progress is None:
+        progress = {}
+    if ingestion_timestamp is None:
+        ingestion_timestamp = datetime.now().isoformat()
+
+    ads_by_field = {}
+    for event in events:
+        if not event.get("removed") and event.get("id"):
+            occupation_field = (event.get("occupation_field") or {}).get("concept_id")
+            ads_by_field.setdefault(occupation_field, []).append(event)
+
+    def pages():
+        for occupation_field, ads in ads_by_field.items():
+            field_pages = [{"hits": ads[start:start + PAGE_SIZE]} for start in range(0, len(ads), PAGE_SIZE)]
+            if landing_run_dir is not None:
+                field_pages = _land_pages(field_pages, Path(landing_run_dir) / f"occupation_field={occupation_field}" / "stream")
+            yield from field_pages
+
+    yield from _yield_ad_tables(pages(), progress, ingestion_timestamp, columns, text_table, content_hashes, history_table)
+
+# Opens the JSON files of a historical dump as binary streams. JobTech publishes the dumps as JSON arrays or
+# JSON lines, usually compressed: .gz and .zst files and every .json/.jsonl member of a .zip are decompressed
+# while they are read, without unpacking them to disk.
+def _dump_streams(path):
+    path = Path(path)
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if member.endswith((".json", ".jsonl")):
+                    with archive.open(member) as stream:
+                        yield stream
+    elif path.suffix == ".gz":
+        with gzip.open(path, "rb") as stream:
+            yield stream
+    elif path.suffix == ".zst":
+        with open(path, "rb") as dump_file, zstandard.ZstdDecompressor().stream_reader(dump_file) as stream:
+            yield stream
+    else:
+        with open(path, "rb") as stream:
+            yield stream
+
+# Reads the job ads of a dump one at a time, in constant memory whatever the size of the dump.
+# JSON lines are yielded as undecoded lines, which are decoded in the worker processes (see _import_batch).
+# A dump that is one JSON array is read in chunks, and each ad is decoded with raw_decode as soon as it is
+# complete in the buffer; only the part of the buffer after the last decoded ad is kept when the next chunk is read.
+def _read_dump(stream):
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+    buffer = text.read(DUMP_READ_SIZE).lstrip()
+    if not buffer.startswith("["):
+        # Complete the last line of the chunk before going on line by line.
+        lines = (buffer + text.readline()).splitlines()
+        yield from (line for line in lines if line.strip())
+        yield from (line for line in text if line.strip())
+        return
+
+    decoder = json.JSONDecoder()
+    separators = re.compile(r"[\s,]*")
+    position = 1
+    while True:
+        position = separators.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        try:
+            ad, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The ad continues in the next chunk; at the end of the file the dump is truncated.
+            chunk = text.read(DUMP_READ_SIZE)
+            if not chunk:
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield ad
+
+# Splits the ads of all dump files into batches of IMPORT_BATCH_SIZE.
+def _dump_batches(paths):
+    batch = []
+    for path in paths:
+        for stream in _dump_streams(path):
+            for ad in _read_dump(stream):
+                batch.append(ad)
+                if len(batch) == IMPORT_BATCH_SIZE:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+# Turns a batch of ads from a dump into an Arrow table and text rows, like _yield_ad_tables does for a page.
+# Runs in a worker process. Ads outside 'occupation_fields' (all ads if None) are left out.
+# Returns (number of ads in the batch, Arrow table or None, text rows or None).
+def _import_batch(ads, ingestion_timestamp, occupation_fields, columns, with_text_table):
+    ads = [json.loads(ad) if isinstance(ad, str) else ad for ad in ads]
+    rows = [_flatten(ad) for ad in ads if ad.get("id")]
+    if occupation_fields is not None:
+        rows = [row for row in rows if row.get("occupation_field__concept_id") in occupation_fields]
+    if not rows:
+        return len(ads), None, None
+
+    hashed_columns = columns
+    if with_text_table and columns is not None:
+        columns = [name for name in columns if name not in TEXT_COLUMNS]
+    for row in rows:
+        row["id"] = str(row["id"])
+        row["content_hash"] = _content_hash(row, hashed_columns)
+    texts = _text_rows(rows, ingestion_timestamp) if with_text_table else None
+    return len(ads), _rows_to_arrow(rows, ingestion_timestamp, columns), texts
+
+# Loads job ads from the historical dump files JobTech publishes (JSON arrays or JSON lines, see _dump_streams),
+# in the same shape as jobsearch_resource, so the dbt models read imported and fetched ads alike.
+# The dumps are read by a streaming parser (see _read_dump) and the batches are parsed and converted to Arrow
+# tables in a process pool, with at most two batches per worker in flight, so memory does not grow with the dumps.
+# Only ads of the given 'occupation_fields' are loaded (all ads if None).
+# 'columns' and 'text_table' work as in jobsearch_resource. If 'content_hashes' is given, ads that are already
+# loaded are skipped: the loader keeps them up to date, and a dump may hold an older version of the ad.
+# Imported ads are not recorded in the history table, since they were not seen to change.
+# The number of ads read, loaded and skipped is kept in 'progress'.
+@dlt.resource(write_disposition="merge", primary_key="id", columns={"ingestion_timestamp": {"dedup_sort": "desc"}})
+def dump_import_resource(paths, occupation_fields=None, columns=STAGING_COLUMNS, text_table=None, content_hashes=None,
+                         progress=None, ingestion_timestamp=None, max_workers=None):
+    if progress is None:
+        progress = {}
+    if ingestion_timestamp is None:
+        ingestion_timestamp = datetime.now().isoformat()
+    max_workers = max_workers or os.cpu_count()
+    for counter in ("ads_read", "ads", "already_loaded"):
+        progress[counter] = 0
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        batches = _dump_batches(paths)
+        while True:
+            for batch in islice(batches, 2 * max_workers - len(in_flight)):
+                in_flight.append(executor.submit(
+                    _import_batch, batch, ingestion_timestamp, occupation_fields, columns, text_table is not None,
+                ))
+            if not in_flight:
+                break
+
+            ads_read, table, texts = in_flight.popleft().result()
+            progress["ads_read"] += ads_read
+            if table is None:
+                continue
+            if content_hashes is not None:
+                loaded = content_hashes.get(table.select(["id", "publication_date"]).to_pylist())
+                if loaded:
+                    progress["already_loaded"] += len(loaded)
+                    table = table.filter(pc.invert(pc.is_in(table["id"], pa.array(list(loaded)))))
+                    texts = texts and [text for text in texts if text["id"] not in loaded]
+            progress["ads"] += table.num_rows
+            if table.num_rows:
+                yield table
+                if texts:
+                    yield dlt.mark.with_hints(texts, _text_table_hints(text_table), create_table_variant=True)
+
+# Flattens nested objects into one level, with the same '__' separator DLT uses for nested fields
+# (e.g. employer.name becomes employer__name). Lists are kept as they are.
+def _flatten(record, prefix=""):
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}__"))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+# Publication dates without a time zone are in UTC, like the timestamps in the job ads table (see _rows_to_arrow).
+def _utc(timestamp):
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+# Hashes the content of a flattened ad: the given columns (all if None) except the UNHASHED_COLUMNS.
+# An ad keeps its hash until the employer changes something in it, e.g. the deadline or the description.
+def _content_hash(row, columns=None):
+    names = sorted(name for name in (row if columns is None else columns) if name not in UNHASHED_COLUMNS)
+    content = json.dumps([row.get(name) for name in names], ensure_ascii=False, default=str)
+    return hashlib.md5(content.encode("utf8")).hexdigest()
+
+# Builds an Arrow table from a page of flattened ads, with the given columns (those of the ads on the page if None).
+# Timestamp columns are parsed here, since DLT does not detect timestamps in the string columns of Arrow tables.
+# Like the timestamps DLT detects itself, they are stored as UTC.
+# The STAGING_COLUMNS get their STAGING_TYPES, and values of other types are converted to them (e.g. an integer
+# relevance to a float), so with the same 'columns' every page has the same schema, even when a field is missing
+# from all ads on a page. The types of other columns (with columns=None) are inferred from the page.
+def _rows_to_arrow(rows, ingestion_timestamp, columns=None):
+    if columns is None:
+        column_names = list(dict.fromkeys(name for row in rows for name in row))
+    else:
+        column_names = list(columns)
+    column_names = [name for name in column_names if name != "ingestion_timestamp"] + ["ingestion_timestamp"]
+
+    fields = []
+    arrays = []
+    for name in column_names:
+        if name == "ingestion_timestamp":
+            values = [ingestion_timestamp] * len(rows)
+        else:
+            values = [row.get(name) for row in rows]
+        if name in TIMESTAMP_COLUMNS:
+            values = [datetime.fromisoformat(value) if value else None for value in values]
+            array = pa.array(values, type=pa.timestamp("us", tz="UTC"))
+        elif STAGING_TYPES.get(name) == pa.string():
+            array = pa.array([value if value is None or isinstance(value, str) else str(value) for value in values], type=pa.string())
+        elif name in STAGING_TYPES:
+            array = pa.array(values, type=STAGING_TYPES[name])
+        else:
+            array = pa.array(values)
+        # 'id' is the primary key, which DLT requires to be non-nullable.
+        fields.append(pa.field(name, array.type, nullable=name != "id"))
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+# Yields the ads of each page in offset order, one Arrow table per page.
+# With a 'text_table', the text columns of the page are yielded as rows of a table variant of the resource.
+# They are plain rows rather than an Arrow table, since DLT 1.10 ignores the table name of variants for Arrow tables.
+# With 'content_hashes', unchanged ads are skipped; the number of new, changed and unchanged ads is kept in 'progress'.
+# With a 'history_table', the new and changed ads are also recorded in that table variant.
+def _yield_ad_tables(pages, progress, ingestion_timestamp, columns=None, text_table=None, content_hashes=None,
+                     history_table=None):
+    hashed_columns = columns
+    if text_table is not None and columns is not None:
+        columns = [name for name in columns if name not in TEXT_COLUMNS]
+    seen_ids = set()
+    for page in pages:
+        ads = []
+        for ad in page.get("hits", []):
+            if ad.get("publication_date"):
+                publication_date = datetime.fromisoformat(ad["publication_date"])
+                if "last_publication_date" not in progress or publication_date > progress["last_publication_date"]:
+                    progress["last_publication_date"] = publication_date
+
+            # Overlapping search windows return some ads twice, so only the IDs seen in this run are checked here.
+            # Ads loaded by earlier runs are deduplicated by the merge in DuckDB.
             ad_id = ad.get("id")
-            if ad_id and ad_id not in existing_ids:
-                ad["ingestion_timestamp"] = datetime.now().isoformat() #To enable visualization of the latest data ingestion in the Streamlit app
-                yield ad
+            if ad_id and ad_id not in seen_ids:
+                seen_ids.add(ad_id)
+                ads.append(ad)
+            elif ad_id:
+                progress["duplicates_skipped"] = progress.get("duplicates_skipped", 0) + 1
+        progress["ads"] = len(seen_ids)
 
-        # If fewer ads than the limit are returned, or if the offset exceeds 1900, stop fetching.
-        if len(hits) < limit or offset > 1900:
-            break
+        rows = [_flatten(ad) for ad in ads]
+        for row in rows:
+            row["content_hash"] = _content_hash(row, hashed_columns)
+        if content_hashes is not None:
+            rows, changes = _changed_rows(rows, content_hashes, progress, ingestion_timestamp)
+            if history_table is not None and changes:
+                yield dlt.mark.with_hints(changes, _history_table_hints(history_table), create_table_variant=True)
 
-        offset += limit
+        if rows:
+            yield _rows_to_arrow(rows, ingestion_timestamp, columns) #ingestion_timestamp enables visualization of the latest data ingestion in the Streamlit app
+            if text_table is not None:
+                texts = _text_rows(rows, ingestion_timestamp)
+                yield dlt.mark.with_hints(texts, _text_table_hints(text_table), create_table_variant=True)
 
-# Creates and runs a DLT pipeline to load job ads for specified occupation fields.
-# The pipeline is configured to write to a DuckDB database.
-def run_pipeline(query, table_name, occupation_fields):
-    pipeline = dlt.pipeline(
+# Rows for the side table with the TEXT_COLUMNS of the given flattened ads.
+def _text_rows(rows, ingestion_timestamp):
+    return [
+        dict({name: row.get(name) for name in ("id",) + TEXT_COLUMNS}, ingestion_timestamp=ingestion_timestamp)
+        for row in rows
+    ]
+
+# Compares a page of flattened ads with the stored content hashes and keeps only the new and changed ads.
+# Returns the kept rows and one change record per kept ad, for the history table.
+def _changed_rows(rows, content_hashes, progress, ingestion_timestamp):
+    stored = content_hashes.get(rows)
+    changed_rows = []
+    changes = []
+    for row in rows:
+        previous_hash = stored.get(row["id"])
+        if previous_hash == row["content_hash"]:
+            progress["unchanged"] = progress.get("unchanged", 0) + 1
+            continue
+        change_type = "new" if previous_hash is None else "changed"
+        progress[change_type] = progress.get(change_type, 0) + 1
+        changed_rows.append(row)
+        changes.append({
+            "id": row["id"],
+            "change_type": change_type,
+            "content_hash": row["content_hash"],
+            "previous_content_hash": previous_hash,
+            "application_deadline": row.get("application_deadline"),
+            "number_of_vacancies": row.get("number_of_vacancies"),
+            "ingestion_timestamp": ingestion_timestamp,
+        })
+    content_hashes.record({row["id"]: row["content_hash"] for row in changed_rows})
+    return changed_rows, changes
+
+# Hints for the history table: every change is appended.
+# The variant inherits the column hints of the resource, so the dedup_sort on 'ingestion_timestamp', which only
+# applies to merges, is cleared here.
+def _history_table_hints(history_table):
+    return dlt.mark.make_hints(
+        table_name=history_table,
+        write_disposition="append",
+        columns={"ingestion_timestamp": {"data_type": "timestamp", "dedup_sort": None}},
+    )
+
+# Hints for the side table with the text columns: merged on 'id' like the job ads table itself.
+def _text_table_hints(text_table):
+    return dlt.mark.make_hints(
+        table_name=text_table,
+        write_disposition="merge",
+        primary_key="id",
+        columns={"ingestion_timestamp": {"dedup_sort": "desc"}},
+    )
+
+# Creates the DLT pipeline that writes to the DuckDB database.
+# DLT does not add its _dlt_load_id and _dlt_id columns to Arrow tables by default, but the job ads table requires them.
+# Runs that may happen at the same time in other processes (see run_pipeline) get their own 'pipelines_dir', since
+# DLT keeps the state of a pipeline and its pending load packages in a local working directory.
+# 'db_path' is the DuckDB file to write to, DB_PATH by default.
+def _create_pipeline(pipelines_dir=None, db_path=None):
+    dlt.config["normalize.parquet_normalizer.add_dlt_load_id"] = True
+    dlt.config["normalize.parquet_normalizer.add_dlt_id"] = True
+    return dlt.pipeline(
         pipeline_name="jobads_project",
-        destination=dlt.destinations.duckdb("jobads_data_warehouse.duckdb"),
+        pipelines_dir=pipelines_dir,
+        destination=dlt.destinations.duckdb(db_path or DB_PATH),
         dataset_name="staging",
     )
 
-    # Get existing IDs from the database to avoid duplicates.
-    existing_ids = get_existing_ids()
-    
-    # Iterate over each occupation field and load job ads into the pipeline.
+# Empties the given tables of the dataset. Tables that do not exist yet are skipped.
+def _truncate_tables(dataset_name, table_names):
+    with duckdb.connect(DB_PATH) as con:
+        for table_name in table_names:
+            try:
+                con.execute(f"TRUNCATE {dataset_name}.{table_name}")
+            except duckdb.CatalogException:
+                pass
+
+
+# Rebuilds the job ads table from the landing zone, without touching the network.
+# The tables are emptied first, so schema changes made since the ads were fetched are applied to all of them.
+# DLT only empties the tables of the resources in the run, so the replay resources get the same names as the
+# resources of run_pipeline, which created the tables. The text and history tables are also written by the
+# stream resources, which DLT does not count as part of the run, so they are emptied here.
+def replay_pipeline(table_name, occupation_fields, landing_root=LANDING_DIR):
+    pipeline = _create_pipeline()
+    resources = [
+        landing_replay_resource(
+            occupation_field, landing_root, text_table=f"{table_name}_text", history_table=f"{table_name}_history",
+        ).with_name(f"jobsearch_{occupation_field}")
+        for occupation_field in occupation_fields
+    ]
+    with duckdb_lock():
+        _truncate_tables(pipeline.dataset_name, [f"{table_name}_text", f"{table_name}_history"])
+        load_info = pipeline.run(resources, table_name=table_name, refresh="drop_data")
+    print(f"Occupation fields (replay): {', '.join(occupation_fields)}")
+    print(load_info)
+
+# Loads historical dump files into the job ads table, next to the ads fetched from the API (see dump_import_resource).
+# A replay of the landing zone empties the table, so dumps have to be imported again after a replay.
+def import_pipeline(table_name, paths, occupation_fields=None):
+    pipeline = _create_pipeline()
+    content_hashes = ContentHashes(f"{pipeline.dataset_name}.{table_name}")
+    progress = {}
+    resource = dump_import_resource(
+        paths, occupation_fields, text_table=f"{table_name}_text", content_hashes=content_hashes, progress=progress,
+    ).with_name("job_ads_import").apply_hints(table_name=table_name)
+    pipeline.extract(resource)
+    pipeline.normalize()
+    with duckdb_lock():
+        load_info = pipeline.load()
+    print(f"Dumps: {', '.join(str(path) for path in paths)}")
+    print(f"Ads read: {progress['ads_read']}, loaded: {progress['ads']}, already loaded: {progress['already_loaded']}")
+    print(load_info)
+    return progress
+
+# Creates and runs a DLT pipeline to load job ads for specified occupation fields.
+# The pipeline is configured to write to a DuckDB database.
+# All occupation fields are fetched concurrently through one connection pool, limited to max_concurrent_requests.
+# Each field is split into shards below the offset ceiling of the search API, and the shards are fetched in parallel.
+# All fields are loaded in a single pipeline run, so extract, normalize and load only run once.
+# The stages are run one at a time. Their durations, together with request latencies, response sizes, hits per page
+# and duplicates (see ingestion_metrics.py), are saved to meta.ingestion_metrics and returned.
+# Fetching the pages happens during extract.
+# With incremental=True only ads published since the saved watermark of each occupation field are requested.
+# With a 'publication_day' (a date) only the ads published that day are requested instead, and the watermarks and
+# the stream API are left alone (see stream_pipeline). Such runs can be started in parallel for different days and
+# occupation fields, e.g. as the partitions of the Dagster asset: each has its own DLT working directory, and
+# the DuckDB file is only written under an exclusive duckdb_lock.
+# The raw pages are kept in the landing zone under landing_root, partitioned by run and occupation field.
+# Only the STAGING_COLUMNS are loaded; the TEXT_COLUMNS go to a side table named '<table_name>_text'.
+# Ads whose content hash has not changed since they were loaded are skipped. New and changed ads are recorded in
+# '<table_name>_history'.
+# The stream API is read in the same load (see _stream_resources): ads removed since the last run go to
+# '<table_name>_removed', and ads edited since the last run are checked for changes like the ads of the search,
+# which only returns the ads published since the watermarks.
+def run_pipeline(query, table_name, occupation_fields, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, incremental=True,
+                 landing_root=LANDING_DIR, publication_day=None):
+    pipelines_dir = None if publication_day is None else _partition_pipelines_dir(occupation_fields, publication_day)
+    pipeline = _create_pipeline(pipelines_dir)
+
+    watermarks = get_watermarks() if incremental and publication_day is None else {}
+    # The run ID of the landing zone is also the ingestion timestamp, so a replay restores the same timestamps.
+    run_started = datetime.now().replace(microsecond=0)
+    run_dir = Path(landing_root) / f"run_id={run_started.strftime(RUN_ID_FORMAT)}"
+
+    params_list = []
+    landing_dirs = []
     for occupation_field in occupation_fields:
-        params = {"q": query, "limit": 100, "occupation-field": occupation_field}
-        load_info = pipeline.run(
-            jobsearch_resource(params=params, existing_ids=existing_ids),
-            table_name=table_name
-        )
-        print(f"Occupation field: {occupation_field}")
+        params = {"q": query, "limit": PAGE_SIZE, "occupation-field": occupation_field}
+        landing_dir = run_dir / f"occupation_field={occupation_field}"
+        if publication_day is not None:
+            params["published-after"] = f"{publication_day.isoformat()}T00:00:00"
+            params["published-before"] = f"{(publication_day + timedelta(days=1)).isoformat()}T00:00:00"
+            landing_dir = landing_dir / f"publication_day={publication_day.isoformat()}"
+        elif occupation_field in watermarks:
+            params["published-after"] = _published_after(watermarks[occupation_field])
+        params_list.append(params)
+        landing_dirs.append(landing_dir)
+
+    metrics = IngestionMetrics()
+    with create_session(max_concurrent_requests, metrics) as session, \
+            ThreadPoolExecutor(max_workers=max_concurrent_requests) as executor:
+        stage_started = time.perf_counter()
+        shards_list = plan_shards(executor, session, params_list)
+        searches = submit_searches(executor, session, shards_list)
+        metrics.record_run(plan_seconds=time.perf_counter() - stage_started)
+
+        progress = {occupation_field: {} for occupation_field in occupation_fields}
+        content_hashes = ContentHashes(f"{pipeline.dataset_name}.{table_name}")
+        resources = [
+            jobsearch_resource(
+                params=params,
+                pages=pages,
+                progress=progress[occupation_field],
+                landing_dir=landing_dir,
+                ingestion_timestamp=run_started.isoformat(),
+                text_table=f"{table_name}_text",
+                content_hashes=content_hashes,
+                history_table=f"{table_name}_history",
+            ).with_name(f"jobsearch_{occupation_field}").apply_hints(table_name=table_name)
+            for occupation_field, params, pages, landing_dir in zip(occupation_fields, params_list, searches, landing_dirs)
+        ]
+        stream = {"removals": {}, "updates": {}}
+        if publication_day is None:
+            stream_since = _stream_since(watermarks)
+            resources += _stream_resources(
+                session, stream_since, occupation_fields, table_name, run_dir, run_started.isoformat(), content_hashes, stream,
+            )
+        stage_started = time.perf_counter()
+        pipeline.extract(resources)
+        metrics.record_run(extract_seconds=time.perf_counter() - stage_started, retries=session.retries)
+
+    stage_started = time.perf_counter()
+    pipeline.normalize()
+    metrics.record_run(normalize_seconds=time.perf_counter() - stage_started)
+
+    with duckdb_lock():
+        stage_started = time.perf_counter()
+        load_info = pipeline.load()
+        metrics.record_run(load_seconds=time.perf_counter() - stage_started)
+        print(f"Occupation fields: {', '.join(occupation_fields)}")
+        if publication_day is not None:
+            print(f"Publication day: {publication_day.isoformat()}")
         print(load_info)
 
+        for occupation_field, shards in zip(occupation_fields, shards_list):
+            metrics.record_field(
+                occupation_field,
+                shards=len(shards),
+                ads=progress[occupation_field].get("ads", 0),
+                duplicates_skipped=progress[occupation_field].get("duplicates_skipped", 0),
+                new=progress[occupation_field].get("new", 0),
+                changed=progress[occupation_field].get("changed", 0),
+                unchanged=progress[occupation_field].get("unchanged", 0),
+            )
+        metrics.record_run(
+            removed_ads=stream["removals"].get("removed_ads", 0),
+            stream_ads=stream["updates"].get("ads", 0),
+            stream_new=stream["updates"].get("new", 0),
+            stream_changed=stream["updates"].get("changed", 0),
+        )
+        save_ingestion_metrics(run_started, metrics)
+
+        # The watermarks only move after a successful load, so a failed run is retried from the same point.
+        if publication_day is None:
+            for occupation_field in occupation_fields:
+                if "last_publication_date" in progress[occupation_field]:
+                    save_watermark(occupation_field, progress[occupation_field]["last_publication_date"])
+        if "last_event_date" in stream["removals"]:
+            save_watermark(STREAM_WATERMARK, stream["removals"]["last_event_date"].replace(tzinfo=None))
+
+    # A run for a publication day keeps its working directory only when it fails, so a retry loads its pending packages.
+    if pipelines_dir is not None:
+        shutil.rmtree(pipelines_dir, ignore_errors=True)
+    return metrics.summary()
+
+# DLT working directory of a run for one publication day, see run_pipeline.
+def _partition_pipelines_dir(occupation_fields, publication_day):
+    return str(Path(get_dlt_pipelines_dir()) / "partitions" / f"{'_'.join(occupation_fields)}_{publication_day.isoformat()}")
+
+# Fetches the events of the stream API since 'since' and returns the resources that load them: the removed ads into
+# '<table_name>_removed', and the published or edited ads into '<table_name>' itself (with its text and history
+# tables). Their progress is kept in stream["removals"] (with the date of the latest event) and stream["updates"].
+def _stream_resources(session, since, occupation_fields, table_name, run_dir, ingestion_timestamp, content_hashes, stream):
+    events = _stream_events(session, since, occupation_fields, stream["removals"])
+    return [
+        removed_ads_resource(
+            events, stream["removals"], ingestion_timestamp,
+        ).apply_hints(table_name=f"{table_name}_removed"),
+        updated_ads_resource(
+            events,
+            progress=stream["updates"],
+            landing_run_dir=run_dir,
+            ingestion_timestamp=ingestion_timestamp,
+            text_table=f"{table_name}_text",
+            content_hashes=content_hashes,
+            history_table=f"{table_name}_history",
+        ).apply_hints(table_name=table_name),
+    ]
+
+# Reads the ads removed or edited since the last run from the stream API (see _stream_resources), without searching
+# for ads. run_pipeline does this itself, except in runs for a publication day.
+# Returns the number of removed ads and of new, changed and unchanged ads in the stream.
+def stream_pipeline(table_name, occupation_fields, landing_root=LANDING_DIR):
+    pipeline = _create_pipeline()
+    watermarks = get_watermarks()
+    run_started = datetime.now().replace(microsecond=0)
+    run_dir = Path(landing_root) / f"run_id={run_started.strftime(RUN_ID_FORMAT)}"
+
+    stream = {"removals": {}, "updates": {}}
+    stream_since = _stream_since(watermarks)
+    content_hashes = ContentHashes(f"{pipeline.dataset_name}.{table_name}")
+    with create_session() as session:
+        pipeline.extract(_stream_resources(
+            session, stream_since, occupation_fields, table_name, run_dir, run_started.isoformat(), content_hashes, stream,
+        ))
+    pipeline.normalize()
+    with duckdb_lock():
+        load_info = pipeline.load()
+        if "last_event_date" in stream["removals"]:
+            save_watermark(STREAM_WATERMARK, stream["removals"]["last_event_date"].replace(tzinfo=None))
+    result = {"removed_ads": stream["removals"].get("removed_ads", 0)}
+    result.update((counter, stream["updates"].get(counter, 0)) for counter in ("new", "changed", "unchanged"))
+    print(f"Removed ads: {result['removed_ads']}, new: {result['new']}, changed: {result['changed']}, unchanged: {result['unchanged']}")
+    print(load_info)
+    return result
+
 # Main function to execute the script.
 # It sets the working directory, defines parameters, and calls the run_pipeline function.
+# Run with --replay to rebuild the job ads table from the landing zone instead of calling the API,
+# or with --import <dump files> to load historical dumps, or with --day YYYY-MM-DD to (re)load the ads published that day.
 if __name__ == "__main__":
+    # Dump files are given relative to the directory the script is started from.
+    dump_paths = []
+    if "--import" in sys.argv[1:]:
+        dump_paths = [Path(path).resolve() for path in sys.argv[sys.argv.index("--import") + 1:]]
+
     working_directory = Path(__file__).parent
     os.chdir(working_directory)
 
@@ -97,4 +1198,12 @@ if __name__ == "__main__":
     # "Yrken med social inriktning",  "Yrken med teknisk inriktning", "Chefer och verksamhetsledare"
     occupation_fields = ("GazW_2TU_kJw", "6Hq3_tKo_V57", "bh3H_Y3h_5eD")
 
-    run_pipeline(query, table_name, occupation_fields)
+    if "--replay" in sys.argv[1:]:
+        replay_pipeline(table_name, occupation_fields)
+    elif dump_paths:
+        import_pipeline(table_name, dump_paths, occupation_fields)
+    elif "--day" in sys.argv[1:]:
+        publication_day = date.fromisoformat(sys.argv[sys.argv.index("--day") + 1])
+        run_pipeline(query, table_name, occupation_fields, publication_day=publication_day)
+    else:
+        run_pipeline(query, table_name, occupation_fields)
@@ -1,47 +1,170 @@
-from dagster import asset, AssetIn, AssetMaterialization, Output
+from dagster import asset, AssetExecutionContext, AssetKey, AssetObservation, MaterializeResult, MetadataValue
+from dagster import Backoff, DailyPartitionsDefinition, Jitter, MultiPartitionsDefinition, RetryPolicy, StaticPartitionsDefinition
+from dagster_dbt import DagsterDbtTranslator, DbtCliResource, DbtProject, dbt_assets, get_asset_key_for_model
+from datetime import date
 from pathlib import Path
+import os
 import sys
-import subprocess
 
 # Telling Python where to find the load_job_ads module
 # This is necessary because the load_job_ads.py file is located two directories up from this script.
 sys.path.append(str(Path(__file__).resolve().parents[2]))
 
 # Importing the run_pipeline function from load_job_ads.py
-from load_job_ads import run_pipeline
+from load_job_ads import duckdb_lock, run_pipeline, stream_pipeline
+from export_marts import export_marts
+from dbt_timings import save_dbt_model_timings
+
+# "Yrken med social inriktning",  "Yrken med teknisk inriktning", "Chefer och verksamhetsledare"
+OCCUPATION_FIELDS = ("GazW_2TU_kJw", "6Hq3_tKo_V57", "bh3H_Y3h_5eD")
+
+# The job ads are loaded per occupation field and publication day, so a backfill of a week runs as separate
+# partitions that Dagster can run in parallel and retry one by one.
+# end_offset=1 includes today, so the scheduled runs pick up the ads published during the day.
+job_ads_partitions = MultiPartitionsDefinition({
+    "occupation_field": StaticPartitionsDefinition(list(OCCUPATION_FIELDS)),
+    "publication_day": DailyPartitionsDefinition(start_date="2025-01-01", end_offset=1, timezone="Europe/Stockholm"),
+})
+
+# Failed partitions are retried on their own, e.g. after API errors that outlasted the retries of a request.
+load_retry_policy = RetryPolicy(max_retries=3, delay=60, backoff=Backoff.EXPONENTIAL, jitter=Jitter.PLUS_MINUS)
 
 # This code defines Dagster assets for loading job ads data
-@asset
-def load_job_ads_asset():
+@asset(partitions_def=job_ads_partitions, retry_policy=load_retry_policy)
+def load_job_ads_asset(context):
     """
      The Dagster asset, that loads job ads data into DuckDB.
     
-    This asset runs the DLT pipeline defined in `load_job_ads.py`, using specified
-    query parameters and occupation fields. The data is written to the 'job_ads' table
+    This asset runs the DLT pipeline defined in `load_job_ads.py`, for the occupation field and
+    publication day of the partition. The data is written to the 'job_ads' table
     in the 'jobads_data_warehouse.duckdb' database.
+    Partitions can run in parallel; the writes to the database are serialized by the pipeline.
+
+    The ingestion metrics of the run (stage durations, request latencies, response sizes,
+    hits per page and duplicates) are attached as asset metadata. They are also saved
+    to the 'meta.ingestion_metrics' table.
     """
     query = ""
     table_name = "job_ads"
-    occupation_fields = ("GazW_2TU_kJw", "6Hq3_tKo_V57", "bh3H_Y3h_5eD")
-    run_pipeline(query, table_name, occupation_fields)
+    partition = context.partition_key.keys_by_dimension
+    metrics = run_pipeline(
+        query, table_name, (partition["occupation_field"],),
+        publication_day=date.fromisoformat(partition["publication_day"]),
+    )
+
+    run = metrics["run"]
+    field_rows = "\n".join(
+        f"| {occupation_field} | {values.get('ads', 0):.0f} | {values.get('duplicates_skipped', 0):.0f} "
+        f"| {values.get('requests', 0):.0f} | {values.get('hits_per_page', 0):.1f} "
+        f"| {values.get('latency_p95_seconds', 0):.2f} | {values.get('response_bytes', 0) / 1e6:.1f} |"
+        for occupation_field, values in metrics["occupation_fields"].items()
+    )
+    return MaterializeResult(metadata={
+        "ads": int(run["ads"]),
+        "duplicates_skipped": int(run["duplicates_skipped"]),
+        "new": int(run["new"]),
+        "changed": int(run["changed"]),
+        "unchanged": int(run["unchanged"]),
+        "requests": int(run["requests"]),
+        "retries": int(run.get("retries", 0)),
+        "response_mb": round(run["response_bytes"] / 1e6, 1),
+        "latency_p50_seconds": run.get("latency_p50_seconds", 0.0),
+        "latency_p95_seconds": run.get("latency_p95_seconds", 0.0),
+        "plan_seconds": run["plan_seconds"],
+        "extract_seconds": run["extract_seconds"],
+        "normalize_seconds": run["normalize_seconds"],
+        "load_seconds": run["load_seconds"],
+        "occupation_fields": MetadataValue.md(
+            "| Occupation field | Ads | Duplicates | Requests | Hits/page | p95 latency (s) | MB |\n"
+            "|---|---|---|---|---|---|---|\n" + field_rows
+        ),
+    })
 
 
-# The following code defines Dagster assets for running DBT transformations. 
-# The asset depends on the `load_job_ads_asset` to ensure that the job ads data is loaded before running the transformations.
-@asset(deps = [load_job_ads_asset])
-def run_dbt_transformations():
+# Ads removed from or edited in Platsbanken are not tied to a publication day, so they are read once per pipeline run.
+@asset(retry_policy=load_retry_policy)
+def load_stream_asset():
     """
-    The Dagster asset that runs DBT transformations on the job ads data.
-    
-    This asset executes the DBT command to run transformations defined in the DBT project.
-    It is dependent on the `load_job_ads_asset` to ensure that the job ads data is loaded before
-    running the transformations.
+    The Dagster asset that reads the ads removed or edited since the last run from the JobTech stream API.
+    Removed ads go to the 'job_ads_removed' table, which keeps them out of the marts. Edited ads are loaded
+    into the 'job_ads' table and recorded in 'job_ads_history', since the partitions of 'load_job_ads_asset'
+    only search the ads published on their day.
     """
-    dbt_path = Path(__file__).resolve().parents[2] / "dbt_jobads_project"
-    subprocess.run(["dbt", "run", "--project-dir", str(dbt_path)], check=True)
+    stream = stream_pipeline("job_ads", OCCUPATION_FIELDS)
+    return MaterializeResult(metadata={counter: int(value) for counter, value in stream.items()})
 
-    yield AssetMaterialization(
-        asset_key="run_dbt_transformations",
-        description="DBT transformations have been successfully run on the job_ads data.",
-    )
-    yield Output("DBT transformations completed successfully.")
+
+# The DBT project. In `dagster dev` its manifest is (re)built when the definitions are loaded; in a deployment it is
+# built beforehand with `dagster-dbt project prepare-and-package`.
+# The profile is not part of the project: like the dbt CLI, it is read from DBT_PROFILES_DIR or ~/.dbt.
+dbt_project = DbtProject(
+    project_dir=Path(__file__).resolve().parents[2] / "dbt_jobads_project",
+    profiles_dir=os.getenv("DBT_PROFILES_DIR", Path.home() / ".dbt"),
+)
+dbt_project.prepare_if_dev()
+
+# Number of models DBT builds at the same time; models that do not depend on each other, such as the marts, run in parallel.
+DBT_THREADS = 4
+
+# The DBT sources are the tables written by the load assets, so the lineage runs from the JobTech API to the marts.
+# Each asset key can only belong to one source, so the text table (stg_ads_text), which the same loads write, keeps
+# its own key; every model that reads it also reads stg_ads.
+class JobAdsDbtTranslator(DagsterDbtTranslator):
+    SOURCE_ASSETS = {
+        "stg_ads": "load_job_ads_asset",
+        "stg_ads_removed": "load_stream_asset",
+    }
+
+    def get_asset_key(self, dbt_resource_props):
+        if dbt_resource_props["resource_type"] == "source" and dbt_resource_props["name"] in self.SOURCE_ASSETS:
+            return AssetKey(self.SOURCE_ASSETS[dbt_resource_props["name"]])
+        return super().get_asset_key(dbt_resource_props)
+
+
+# The following code defines one Dagster asset per DBT model and snapshot, read from the DBT manifest.
+# Materializing some of them builds only those models (dbt build --select), so a mart can be refreshed together with
+# what is downstream of it without rebuilding the rest. Each model's code version is the checksum of its SQL, which
+# lets the sensor in definitions.py rebuild only the models whose SQL changed.
+@dbt_assets(manifest=dbt_project.manifest_path, dagster_dbt_translator=JobAdsDbtTranslator())
+def jobads_dbt_assets(context: AssetExecutionContext, dbt: DbtCliResource):
+    """
+    The Dagster assets of the DBT models, which transform the job ads into the dimensional model and the marts,
+    and of the snapshots that keep the history of every ad. The tests of the selected models run with them.
+
+    The timings of the models (from dbt's run_results.json) are saved to the 'meta.dbt_model_timings'
+    table. The rows of each model and of the relations it reads, and whether its runtime grows faster
+    than those rows, are attached to the model's asset.
+    """
+    # DBT writes to the same DuckDB file as the load assets, so it waits for any load that is still writing
+    with duckdb_lock():
+        invocation = dbt.cli(["build", "--threads", str(DBT_THREADS)], context=context)
+        yield from invocation.stream()
+        timings = save_dbt_model_timings(invocation.target_path)
+
+    for row in timings:
+        yield AssetObservation(
+            asset_key=get_asset_key_for_model([jobads_dbt_assets], row["model"]),
+            metadata={
+                "execution_seconds": row["execution_seconds"],
+                "input_rows": row["input_rows"],
+                "row_count": row["row_count"],
+                "runtime_outpaces_rows": row["runtime_outpaces_rows"],
+            },
+        )
+    slow_models = [row["model"] for row in timings if row["runtime_outpaces_rows"]]
+    if slow_models:
+        context.log.warning(f"Runtime grows faster than input rows: {', '.join(slow_models)}")
+
+
+# The marts are exported to Parquet after the DBT transformations, so dashboards can read them without the database file.
+@asset(deps = [jobads_dbt_assets])
+def export_marts_to_parquet():
+    """
+    The Dagster asset that exports the marts to Parquet files, partitioned by occupation field
+    and publication month (see `export_marts.py`).
+
+    The number of files written per mart is attached as asset metadata.
+    """
+    with duckdb_lock(shared=True):
+        files = export_marts()
+    return MaterializeResult(metadata={f"{mart}_files": count for mart, count in files.items()})
@@ -1,29 +1,99 @@
-
 from dagster import Definitions, load_assets_from_modules
 import assets
 #from orchestration import assets
-from dagster import define_asset_job, AssetSelection, ScheduleDefinition
+from dagster import define_asset_job, AssetSelection
+from dagster import AssetKey, DagsterRunStatus, MultiPartitionKey, RunRequest, RunsFilter, SkipReason, schedule, sensor
+from dagster_dbt import DbtCliResource, get_asset_key_for_model
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+import hashlib
 
 # Load all @asset-decorated functions from the assets module
 all_assets = load_assets_from_modules([assets])
 
-# Define a job that includes all assets
+# Define a job that loads the job ads, one run per occupation field and publication day (partition).
+# Backfills in the Dagster UI run the partitions of this job in parallel, as many at a time as the run coordinator
+# allows (max_concurrent_runs in dagster.yaml).
+load_job_ads_job = define_asset_job(
+    name="load_job_ads",
+    selection=AssetSelection.assets("load_job_ads_asset"),
+    partitions_def=assets.job_ads_partitions,
+)
+
+# Define a job that includes the assets that run once the job ads have been loaded: one asset per DBT model
 pipeline_job = define_asset_job(
     name ="job_ads_pipeline",
-    selection = AssetSelection.assets("load_job_ads_asset", "run_dbt_transformations"),
+    selection = (
+        AssetSelection.assets("load_stream_asset", "export_marts_to_parquet")
+        | AssetSelection.assets(assets.jobads_dbt_assets)
+    ),
 )
 
-# Define a schedule to run the job daily at midnight
-daily_schedule = ScheduleDefinition(
-    job_name=pipeline_job.name,
+# Every DBT model reads the ads through stg_job_ads, so its last build is when the new ads were last transformed
+STAGING_MODEL_KEY = get_asset_key_for_model([assets.jobads_dbt_assets], "stg_job_ads")
 
-    cron_schedule="0 9,16 * * *",  # Every day at midnight
-)
+# Define a schedule that loads the ads of yesterday and today twice a day, for every occupation field.
+# Yesterday is included so the ads published after the last run of the day are not missed.
+@schedule(job=load_job_ads_job, cron_schedule="0 9,16 * * *", execution_timezone="Europe/Stockholm")
+def daily_schedule(context):
+    today = context.scheduled_execution_time.astimezone(ZoneInfo("Europe/Stockholm")).date()
+    for publication_day in (today - timedelta(days=1), today):
+        for occupation_field in assets.OCCUPATION_FIELDS:
+            partition_key = MultiPartitionKey({
+                "occupation_field": occupation_field,
+                "publication_day": publication_day.isoformat(),
+            })
+            yield RunRequest(
+                run_key=f"{partition_key}-{context.scheduled_execution_time.isoformat()}",
+                partition_key=partition_key,
+            )
+
+# Code version (checksum of the SQL) of the last build of a DBT model, or None if it has not been built.
+def _built_code_version(instance, asset_key):
+    event = instance.get_latest_materialization_event(asset_key)
+    if event is None or event.asset_materialization is None:
+        return None
+    return event.asset_materialization.tags.get("dagster/code_version")
 
-# Create a Definitions object to encapsulate the assets, job, and schedule
+# Runs the transformations once all runs that load ads have finished, if any partition was loaded since the last
+# transformation. The transformations wait until then, so they run once per schedule or backfill.
+# Otherwise, the DBT models whose SQL has changed since they were built are rebuilt, with the models downstream of
+# them and nothing else.
+@sensor(job=pipeline_job, minimum_interval_seconds=300)
+def transform_after_load_sensor(context):
+    in_progress = context.instance.get_runs(
+        filters=RunsFilter(statuses=[
+            DagsterRunStatus.QUEUED, DagsterRunStatus.NOT_STARTED, DagsterRunStatus.STARTING, DagsterRunStatus.STARTED,
+        ]),
+        limit=1,
+    )
+    if in_progress:
+        return SkipReason("Waiting for the runs in progress to finish")
+
+    loaded = context.instance.get_latest_materialization_event(AssetKey("load_job_ads_asset"))
+    transformed = context.instance.get_latest_materialization_event(STAGING_MODEL_KEY)
+    if loaded is not None and (transformed is None or transformed.timestamp < loaded.timestamp):
+        return RunRequest(run_key=f"ads-{loaded.storage_id}")
+
+    changed = sorted(
+        (asset_key.to_user_string(), code_version)
+        for asset_key, code_version in assets.jobads_dbt_assets.code_versions_by_key.items()
+        if code_version and _built_code_version(context.instance, asset_key) != code_version
+    )
+    if not changed:
+        return SkipReason("No job ads loaded and no DBT models changed since the last transformation")
+    changed_keys = [AssetKey.from_user_string(asset_key) for asset_key, _ in changed]
+    selection = AssetSelection.assets(*changed_keys).downstream().resolve(all_assets)
+    return RunRequest(
+        run_key="models-" + hashlib.md5(repr(changed).encode("utf8")).hexdigest(),
+        asset_selection=list(selection),
+    )
+
+# Create a Definitions object to encapsulate the assets, jobs, schedule, sensor and the DBT resource
 defs = Definitions(
     assets=all_assets,
-    jobs=[pipeline_job],
+    jobs=[load_job_ads_job, pipeline_job],
     schedules=[daily_schedule],
+    sensors=[transform_after_load_sensor],
+    resources={"dbt": DbtCliResource(project_dir=assets.dbt_project)},
 )
-
@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+import duckdb
+import pytest
+
+# load_job_ads.py and the mock JobTech API are in the repository root, two directories up from this file.
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(REPO_ROOT))
+sys.path.append(str(REPO_ROOT / "benchmarks"))
+
+import load_job_ads
+from mock_jobtech_api import start_server, synthetic_ads
+
+
+# The ads the mock JobTech API serves to the pipeline runs of the 'warehouse' fixture.
+# A test module can override this fixture to serve other ads.
+@pytest.fixture
+def warehouse_ads():
+    return synthetic_ads(200)
+
+
+# The mock JobTech API (search and stream) serving 'warehouse_ads' on a free port.
+# A test can serve other ads between pipeline runs by setting 'mock_api.RequestHandlerClass.ads'.
+@pytest.fixture
+def mock_api(warehouse_ads):
+    server = start_server(warehouse_ads, port=0)
+    yield server
+    server.shutdown()
+
+
+# Points load_job_ads.py at 'mock_api', and at a DuckDB file and DLT working directory in a temporary directory,
+# so a test can run whole pipelines offline.
+# Returns the landing zone to pass to the pipelines as 'landing_root'.
+@pytest.fixture
+def warehouse(tmp_path, monkeypatch, mock_api):
+    url = f"http://127.0.0.1:{mock_api.server_address[1]}"
+    monkeypatch.setenv("DLT_DATA_DIR", str(tmp_path / "dlt"))
+    monkeypatch.setenv("RUNTIME__DLTHUB_TELEMETRY", "false")
+    monkeypatch.setattr(load_job_ads, "DB_PATH", str(tmp_path / "jobads_data_warehouse.duckdb"))
+    monkeypatch.setattr(load_job_ads, "DB_LOCK_PATH", str(tmp_path / "jobads_data_warehouse.duckdb.lock"))
+    monkeypatch.setattr(load_job_ads, "URL_FOR_SEARCH", f"{url}/search")
+    monkeypatch.setattr(load_job_ads, "URL_FOR_STREAM", f"{url}/stream")
+    monkeypatch.setattr(load_job_ads, "REQUESTS_PER_SECOND", 1000)
+    return tmp_path / "landing" / "job_ads"
+
+
+# Returns a function that runs a query against the warehouse of the 'warehouse' fixture and returns all rows.
+@pytest.fixture
+def query(warehouse):
+    def run_query(sql, parameters=None):
+        with duckdb.connect(load_job_ads.DB_PATH, read_only=True) as con:
+            return con.execute(sql, parameters).fetchall()
+    return run_query
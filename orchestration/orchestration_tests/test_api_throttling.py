@@ -0,0 +1,230 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+# api_throttling.py is in the repository root, two directories up from this file.
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import api_throttling
+from api_throttling import AdaptiveConcurrencyLimit, ThrottledSession, TokenBucket, _retry_after
+
+URL = "http://jobtech.test/search"
+
+
+# Answers every request with the next outcome: (status code, headers) or an exception to raise.
+# The last outcome is repeated once the others are used up.
+class StubAdapter(HTTPAdapter):
+    def __init__(self, *outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)
+        self.requests = 0
+
+    def send(self, request, **kwargs):
+        self.requests += 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        status_code, headers = outcome
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers)
+        response.url = request.url
+        response.request = request
+        response._content = b"{}"
+        return response
+
+
+# Records the time the session sleeps between retries, and sleeps for real so the token bucket's pauses still pass.
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    sleep = time.sleep
+
+    def recording_sleep(seconds):
+        recorded.append(seconds)
+        sleep(seconds)
+
+    monkeypatch.setattr(api_throttling.time, "sleep", recording_sleep)
+    return recorded
+
+
+def _session(adapter, **settings):
+    settings = dict(dict(max_retries=5, retry_budget=100, backoff_base=0.001, backoff_max=0.01), **settings)
+    session = ThrottledSession(4, requests_per_second=1000, timeout=1, **settings)
+    session.mount("http://", adapter)
+    return session
+
+
+# === ThrottledSession ===
+
+def test_failed_requests_are_retried_until_they_succeed(sleeps):
+    adapter = StubAdapter((503, {}), (500, {}), (200, {}))
+    with _session(adapter) as session:
+        response = session.get(URL)
+
+    assert response.status_code == 200
+    assert adapter.requests == 3
+    assert session.retries == 2
+
+
+def test_the_last_response_is_returned_when_the_retries_run_out(sleeps):
+    adapter = StubAdapter((503, {}))
+    with _session(adapter, max_retries=2) as session:
+        response = session.get(URL)
+
+    assert adapter.requests == 3
+    with pytest.raises(requests.HTTPError):
+        response.raise_for_status()
+
+
+def test_all_requests_share_the_retry_budget(sleeps):
+    adapter = StubAdapter((503, {}))
+    with _session(adapter, retry_budget=3) as session:
+        first = session.get(URL)
+        requests_after_first = adapter.requests
+        second = session.get(URL)
+
+    assert (first.status_code, second.status_code) == (503, 503)
+    assert requests_after_first == 4
+    # The budget is spent, so the second request is not retried at all.
+    assert adapter.requests == 5
+    assert session.retries == 3
+
+
+def test_connection_errors_are_raised_when_the_retries_run_out(sleeps):
+    adapter = StubAdapter(requests.ConnectionError("connection refused"))
+    with _session(adapter, max_retries=1) as session:
+        with pytest.raises(requests.ConnectionError):
+            session.get(URL)
+
+    assert adapter.requests == 2
+
+
+def test_client_errors_are_not_retried(sleeps):
+    adapter = StubAdapter((400, {}), (200, {}))
+    with _session(adapter) as session:
+        response = session.get(URL)
+
+    assert response.status_code == 400
+    assert adapter.requests == 1
+    assert sleeps == []
+
+
+def test_retry_after_is_waited_for_by_every_request(sleeps):
+    adapter = StubAdapter((429, {"Retry-After": "0.2"}), (200, {}))
+    with _session(adapter) as session:
+        started = time.monotonic()
+        response = session.get(URL)
+        elapsed = time.monotonic() - started
+
+        assert response.status_code == 200
+        assert sleeps[0] == 0.2
+        assert elapsed >= 0.2
+        # The pause is kept in the token bucket, so other requests of the session wait as well.
+        assert session.rate_limiter._paused_until <= time.monotonic()
+        assert session.rate_limiter._paused_until > started + 0.15
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"Retry-After": "3"}, 3.0),
+    ({"Retry-After": "1.5"}, 1.5),
+    ({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, None),
+    ({}, None),
+])
+def test_retry_after_header(headers, expected):
+    response = requests.Response()
+    response.headers.update(headers)
+    assert _retry_after(response) == expected
+
+
+def test_retry_after_without_a_response():
+    assert _retry_after(None) is None
+
+
+# === TokenBucket ===
+
+def test_token_bucket_allows_a_burst_and_then_the_rate():
+    bucket = TokenBucket(rate=50, capacity=5)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    burst = time.monotonic() - started
+    for _ in range(5):
+        bucket.acquire()
+    elapsed = time.monotonic() - started
+
+    assert burst < 0.05
+    assert elapsed >= 0.09
+
+
+def test_token_bucket_pause_stops_all_requests():
+    bucket = TokenBucket(rate=1000)
+    bucket.pause(0.2)
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.19
+
+
+# === AdaptiveConcurrencyLimit ===
+
+def test_limit_grows_by_about_one_per_round_of_successes():
+    limit = AdaptiveConcurrencyLimit(maximum=8, initial=4)
+    for _ in range(4):
+        limit.record_success(latency=0.1)
+    assert 4.9 < limit.limit < 5
+
+
+def test_limit_does_not_grow_past_the_maximum():
+    limit = AdaptiveConcurrencyLimit(maximum=4, initial=4)
+    limit.record_success(latency=0.1)
+    assert limit.limit == 4
+
+
+def test_limit_is_halved_once_per_latency_target_when_throttled():
+    limit = AdaptiveConcurrencyLimit(maximum=16, initial=8, latency_target=2.0)
+    limit.record_throttle()
+    # Requests that were in flight when the API started throttling fail together: they count as one decrease.
+    limit.record_throttle()
+    assert limit.limit == 4
+
+
+# The monotonic clock starts near zero on a freshly booted host, which must not look like a recent decrease.
+def test_first_throttle_halves_the_limit_right_after_boot(monkeypatch):
+    monkeypatch.setattr(api_throttling.time, "monotonic", lambda: 1.0)
+    limit = AdaptiveConcurrencyLimit(maximum=16, initial=8, latency_target=2.0)
+    limit.record_throttle()
+    assert limit.limit == 4
+
+
+def test_slow_responses_count_as_throttling():
+    limit = AdaptiveConcurrencyLimit(maximum=16, initial=8, latency_target=2.0)
+    limit.record_success(latency=3.0)
+    assert limit.limit == 4
+
+
+def test_limit_does_not_drop_below_the_minimum():
+    limit = AdaptiveConcurrencyLimit(maximum=16, minimum=2, initial=8, latency_target=0.0)
+    for _ in range(5):
+        limit.record_throttle()
+    assert limit.limit == 2
+
+
+def test_requests_over_the_limit_wait_for_a_request_to_finish():
+    limit = AdaptiveConcurrencyLimit(maximum=4, initial=2)
+    entered = threading.Event()
+
+    def third_request():
+        with limit:
+            entered.set()
+
+    with limit, limit:
+        thread = threading.Thread(target=third_request)
+        thread.start()
+        assert not entered.wait(0.1)
+    assert entered.wait(1)
+    thread.join()
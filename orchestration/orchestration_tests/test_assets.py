@@ -1 +1,64 @@
+from pathlib import Path
 
+import pytest
+
+pytest.importorskip("dagster_dbt")
+
+from dagster import AssetKey, DagsterInstance, Definitions, RunRequest, build_sensor_context
+
+# definitions.py imports assets.py as a top-level module, as `dagster dev -f definitions.py` does.
+ORCHESTRATION_DIR = Path(__file__).resolve().parents[1] / "orchestration"
+MANIFEST_PATH = Path(__file__).resolve().parents[2] / "dbt_jobads_project" / "target" / "manifest.json"
+
+# The DBT assets are read from the DBT manifest, which is built by `dbt parse` (or `dagster dev`), not checked in.
+pytestmark = pytest.mark.skipif(not MANIFEST_PATH.exists(), reason="no DBT manifest, run dbt parse in dbt_jobads_project")
+
+
+# The Dagster definitions, loaded with a DBT profile in a temporary directory.
+@pytest.fixture(scope="module")
+def definitions(tmp_path_factory):
+    profiles_dir = tmp_path_factory.mktemp("dbt")
+    (profiles_dir / "profiles.yml").write_text(
+        "dbt_jobads_project:\n"
+        "  target: dev\n"
+        "  outputs:\n"
+        "    dev:\n"
+        "      type: duckdb\n"
+        f"      path: {profiles_dir / 'jobads_data_warehouse.duckdb'}\n"
+    )
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("DBT_PROFILES_DIR", str(profiles_dir))
+        monkeypatch.syspath_prepend(str(ORCHESTRATION_DIR))
+        import definitions
+        yield definitions
+
+
+def test_definitions_load(definitions):
+    Definitions.validate_loadable(definitions.defs)
+
+
+def test_jobs_and_sensor_resolve(definitions):
+    load_job = definitions.defs.get_job_def("load_job_ads")
+    pipeline_job = definitions.defs.get_job_def("job_ads_pipeline")
+    definitions.defs.get_sensor_def("transform_after_load_sensor")
+
+    assert load_job.partitions_def == definitions.assets.job_ads_partitions
+    assert AssetKey(["mart", "job_text"]) in pipeline_job.asset_layer.asset_graph.get_all_asset_keys()
+
+
+# The DBT sources map to the load assets, so the lineage runs from the JobTech API to the marts.
+def test_dbt_sources_depend_on_the_load_assets(definitions):
+    deps = definitions.assets.jobads_dbt_assets.asset_deps
+    assert AssetKey("load_job_ads_asset") in deps[AssetKey(["staging", "stg_job_ads"])]
+
+
+# Before anything has been built, every DBT model counts as changed, so the sensor requests all of them and what is
+# downstream of them.
+def test_sensor_requests_the_unbuilt_models(definitions):
+    with DagsterInstance.ephemeral() as instance:
+        request = definitions.transform_after_load_sensor(build_sensor_context(instance=instance))
+
+    assert isinstance(request, RunRequest)
+    assert set(request.asset_selection) == set(definitions.assets.jobads_dbt_assets.keys) | {
+        AssetKey("export_marts_to_parquet"),
+    }
@@ -0,0 +1,165 @@
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import duckdb
+import pytest
+import requests
+
+# load_job_ads.py is in the repository root, two directories up from this file.
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import load_job_ads
+from mock_jobtech_api import OCCUPATION_FIELDS, synthetic_ads
+
+FIELD_IDS = tuple(concept_id for concept_id, _ in OCCUPATION_FIELDS)
+
+ROW = {"id": "1", "headline": "Utvecklare", "application_deadline": "2025-02-01T00:00:00", "number_of_vacancies": 1}
+
+
+def test_content_hash_ignores_the_unhashed_columns_and_key_order():
+    row = dict(ROW, relevance=0.5, ingestion_timestamp="2025-01-01T00:00:00")
+    same = dict(reversed(list(dict(ROW, relevance=0.9, ingestion_timestamp="2025-01-02T00:00:00").items())))
+
+    assert load_job_ads._content_hash(row) == load_job_ads._content_hash(same)
+    assert load_job_ads._content_hash(row) != load_job_ads._content_hash(dict(row, number_of_vacancies=2))
+
+
+def test_content_hash_only_covers_the_given_columns():
+    columns = ("id", "headline", "application_deadline", "number_of_vacancies")
+    assert load_job_ads._content_hash(dict(ROW, employer__name="A"), columns) == load_job_ads._content_hash(ROW, columns)
+    # A column without a value hashes like a missing one, so an ad does not change when the API drops an empty field.
+    assert load_job_ads._content_hash(dict(ROW, employer__name=None), columns + ("employer__name",)) == \
+        load_job_ads._content_hash(ROW, columns + ("employer__name",))
+
+
+def _hashed(row):
+    return dict(row, content_hash=load_job_ads._content_hash(row))
+
+
+def test_changed_rows_keeps_new_and_changed_ads():
+    content_hashes = load_job_ads.ContentHashes()
+    first = [_hashed(ROW), _hashed(dict(ROW, id="2"))]
+    progress = {}
+    rows, changes = load_job_ads._changed_rows(first, content_hashes, progress, "2025-01-01T00:00:00")
+
+    assert rows == first
+    assert [change["change_type"] for change in changes] == ["new", "new"]
+    assert progress == {"new": 2}
+
+    edited = _hashed(dict(ROW, id="2", number_of_vacancies=3))
+    progress = {}
+    rows, changes = load_job_ads._changed_rows([_hashed(ROW), edited], content_hashes, progress, "2025-01-02T00:00:00")
+
+    assert rows == [edited]
+    assert changes == [{
+        "id": "2",
+        "change_type": "changed",
+        "content_hash": edited["content_hash"],
+        "previous_content_hash": first[1]["content_hash"],
+        "application_deadline": "2025-02-01T00:00:00",
+        "number_of_vacancies": 3,
+        "ingestion_timestamp": "2025-01-02T00:00:00",
+    }]
+    assert progress == {"unchanged": 1, "changed": 1}
+    assert content_hashes.get([edited]) == {"2": edited["content_hash"]}
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_job_ads, "DB_PATH", str(tmp_path / "jobads_data_warehouse.duckdb"))
+    monkeypatch.setattr(load_job_ads, "DB_LOCK_PATH", str(tmp_path / "jobads_data_warehouse.duckdb.lock"))
+    return tmp_path / "jobads_data_warehouse.duckdb"
+
+
+# Before the first load there is no database, and then no table: every ad is new.
+def test_content_hashes_are_empty_before_the_first_load(db_path):
+    content_hashes = load_job_ads.ContentHashes("staging.job_ads")
+    assert content_hashes.get([ROW]) == {}
+
+    duckdb.connect(str(db_path)).close()
+    assert content_hashes.get([ROW]) == {}
+
+
+# A database that cannot be read must not make every ad look new, which would load the whole table again.
+def test_content_hashes_raise_when_the_database_cannot_be_read(db_path):
+    db_path.write_bytes(b"not a DuckDB database" * 1000)
+    content_hashes = load_job_ads.ContentHashes("staging.job_ads")
+    with pytest.raises(duckdb.IOException):
+        content_hashes.get([ROW])
+
+
+# Loads of other partitions take the lock exclusively, so a lookup must not keep it once the page is looked up.
+def test_content_hashes_release_the_database_between_lookups(db_path):
+    fcntl = pytest.importorskip("fcntl")
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE SCHEMA staging")
+        con.execute("CREATE TABLE staging.job_ads AS SELECT '1' AS id, 'abc' AS content_hash")
+    content_hashes = load_job_ads.ContentHashes("staging.job_ads")
+    assert content_hashes.get([{"id": "1"}]) == {"1": "abc"}
+
+    with open(load_job_ads.DB_LOCK_PATH, "a+b") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("UPDATE staging.job_ads SET content_hash = 'def'")
+    assert content_hashes.get([{"id": "1"}]) == {"1": "def"}
+
+
+# Answers every GET with the given stream events.
+class StubStream:
+    def __init__(self, events):
+        self.events = events
+
+    def get(self, url, params=None):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(self.events).encode("utf8")
+        return response
+
+
+# The stream mixes removal dates (with or without a time zone) and epoch timestamps: all are compared in UTC,
+# whatever the local time zone is.
+def test_stream_events_record_the_latest_event_in_utc(monkeypatch):
+    monkeypatch.setenv("TZ", "Europe/Stockholm")
+    time.tzset()
+    events = [
+        {"id": "1", "removed": True, "removed_date": "2025-01-01T12:00:00"},
+        {"id": "2", "removed": True, "removed_date": "2025-01-01T14:30:00+02:00"},
+        {"id": "3", "removed": False, "timestamp": int(datetime(2025, 1, 1, 12, 15, tzinfo=timezone.utc).timestamp() * 1000)},
+        {"id": "4", "removed": True},
+    ]
+    progress = {}
+    try:
+        assert load_job_ads._stream_events(StubStream(events), datetime.now(timezone.utc), [], progress) == events
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    assert progress["last_event_date"] == datetime(2025, 1, 1, 12, 30, tzinfo=timezone.utc)
+
+
+def _history_and_texts(query):
+    return query(
+        "SELECT (SELECT count(*) FROM staging.job_ads_history), (SELECT count(*) FROM staging.job_ads_text)"
+    )[0]
+
+
+# A replay rebuilds the history and text tables from the landing zone, so replaying twice gives the same tables.
+# The ads are edited between two runs and the stream is loaded as well, so every resource writes to the history.
+# Landing runs are named after the second they started in, hence the pauses between the runs.
+def test_replay_rebuilds_the_history_instead_of_appending_to_it(warehouse, mock_api, query):
+    load_job_ads.run_pipeline("", "job_ads", FIELD_IDS, landing_root=warehouse)
+    mock_api.RequestHandlerClass.ads = synthetic_ads(200, edited_share=0.2)
+    time.sleep(1)
+    load_job_ads.run_pipeline("", "job_ads", FIELD_IDS, landing_root=warehouse)
+    time.sleep(1)
+    load_job_ads.stream_pipeline("job_ads", FIELD_IDS, landing_root=warehouse)
+    history, texts = _history_and_texts(query)
+    assert history > texts == 600
+
+    for _ in range(2):
+        load_job_ads.replay_pipeline("job_ads", FIELD_IDS, landing_root=warehouse)
+        assert _history_and_texts(query) == (history, texts)
@@ -0,0 +1,44 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# load_job_ads.py is in the repository root, two directories up from this file.
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import load_job_ads
+
+
+ADS = [{"id": str(i), "headline": f"Annons {i}", "description": {"text": "x" * i}} for i in range(20)]
+
+
+# A small read size puts the chunk boundaries inside the ads, between them and inside the separators.
+@pytest.mark.parametrize("read_size", [2, 7, 64, 10_000])
+def test_read_dump_reads_json_arrays_across_chunks(monkeypatch, read_size):
+    monkeypatch.setattr(load_job_ads, "DUMP_READ_SIZE", read_size)
+    dump = "\ufeff [\n" + ",\n  ".join(json.dumps(ad) for ad in ADS) + "\n]\n"
+
+    assert list(load_job_ads._read_dump(io.BytesIO(dump.encode("utf-8")))) == ADS
+
+
+@pytest.mark.parametrize("read_size", [2, 7, 64, 10_000])
+def test_read_dump_reads_json_lines_across_chunks(monkeypatch, read_size):
+    monkeypatch.setattr(load_job_ads, "DUMP_READ_SIZE", read_size)
+    dump = "\n".join(json.dumps(ad) for ad in ADS) + "\n\n"
+
+    lines = list(load_job_ads._read_dump(io.BytesIO(dump.encode("utf-8"))))
+    assert [json.loads(line) for line in lines] == ADS
+
+
+def test_read_dump_raises_on_a_truncated_array(monkeypatch):
+    monkeypatch.setattr(load_job_ads, "DUMP_READ_SIZE", 16)
+    dump = "[" + ",".join(json.dumps(ad) for ad in ADS)[:-5]
+
+    with pytest.raises(json.JSONDecodeError):
+        list(load_job_ads._read_dump(io.BytesIO(dump.encode("utf-8"))))
+
+
+def test_read_dump_reads_an_empty_array():
+    assert list(load_job_ads._read_dump(io.BytesIO(b"[ ]"))) == []
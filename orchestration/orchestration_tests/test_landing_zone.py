@@ -0,0 +1,77 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# load_job_ads.py is in the repository root, two directories up from this file.
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import load_job_ads
+from mock_jobtech_api import OCCUPATION_FIELDS
+
+FIELD_IDS = tuple(concept_id for concept_id, _ in OCCUPATION_FIELDS)
+
+PAGES = [{"hits": [{"id": str(number), "headline": f"Sjuksköterska {number}"}]} for number in range(5)]
+
+
+# === Writing and reading landing files ===
+
+def test_landed_pages_read_back_unchanged(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_job_ads, "PAGES_PER_LANDING_FILE", 2)
+    landing_dir = tmp_path / "run_id=20250101T120000" / "occupation_field=a"
+
+    # The pages are passed on as they are written.
+    assert list(load_job_ads._land_pages(iter(PAGES), landing_dir)) == PAGES
+
+    files = sorted(landing_dir.iterdir())
+    assert [path.name for path in files] == ["part-00000.jsonl.zst", "part-00001.jsonl.zst", "part-00002.jsonl.zst"]
+    assert [page for path in files for page in load_job_ads._read_landing_file(path)] == PAGES
+
+
+# A page that fails to arrive still leaves the pages before it readable.
+def test_landing_files_are_closed_when_the_pages_fail(tmp_path):
+    def failing_pages():
+        yield from PAGES[:2]
+        raise RuntimeError("request failed")
+
+    landing_dir = tmp_path / "landing"
+    with pytest.raises(RuntimeError):
+        list(load_job_ads._land_pages(failing_pages(), landing_dir))
+
+    assert load_job_ads._read_landing_file(landing_dir / "part-00000.jsonl.zst") == PAGES[:2]
+
+
+def test_landing_runs_are_listed_in_chronological_order(tmp_path):
+    for path in [
+        "run_id=20250102T080000/occupation_field=a/part-00000.jsonl.zst",
+        "run_id=20250101T120000/occupation_field=a/publication_day=2025-01-01/part-00000.jsonl.zst",
+        "run_id=20250101T120000/occupation_field=a/stream/part-00000.jsonl.zst",
+        "run_id=20250101T180000/occupation_field=b/part-00000.jsonl.zst",
+    ]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).touch()
+
+    assert load_job_ads._landing_runs(tmp_path, "a") == [
+        ("2025-01-01T12:00:00", [
+            tmp_path / "run_id=20250101T120000/occupation_field=a/publication_day=2025-01-01/part-00000.jsonl.zst",
+            tmp_path / "run_id=20250101T120000/occupation_field=a/stream/part-00000.jsonl.zst",
+        ]),
+        ("2025-01-02T08:00:00", [tmp_path / "run_id=20250102T080000/occupation_field=a/part-00000.jsonl.zst"]),
+    ]
+    assert load_job_ads._landing_runs(tmp_path / "missing", "a") == []
+
+
+# === Replay ===
+
+# A replay reads the landing zone only, and restores the same ads with the same ingestion timestamps.
+def test_replay_restores_the_loaded_ads_without_the_api(warehouse, mock_api, query):
+    load_job_ads.run_pipeline("", "job_ads", FIELD_IDS, landing_root=warehouse)
+    ads_query = "SELECT id, content_hash, ingestion_timestamp FROM staging.job_ads ORDER BY id"
+    loaded = query(ads_query)
+    assert len(loaded) == 600
+
+    mock_api.shutdown()
+    mock_api.server_close()
+    load_job_ads.replay_pipeline("job_ads", FIELD_IDS, landing_root=warehouse)
+
+    assert query(ads_query) == loaded
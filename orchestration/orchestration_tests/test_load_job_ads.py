@@ -0,0 +1,186 @@
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# load_job_ads.py and the mock JobTech API are in the repository root, two directories up from this file.
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(REPO_ROOT))
+sys.path.append(str(REPO_ROOT / "benchmarks"))
+
+import load_job_ads
+from mock_jobtech_api import OCCUPATION_FIELDS, start_server, synthetic_ads
+
+ADS_PER_FIELD = 3000
+
+
+# A mock JobTech API on a free port, with ADS_PER_FIELD synthetic ads per occupation field.
+@pytest.fixture(scope="module")
+def search_api():
+    server = start_server(synthetic_ads(ADS_PER_FIELD), port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def session(search_api, monkeypatch):
+    monkeypatch.setattr(load_job_ads, "URL_FOR_SEARCH", f"{search_api}/search")
+    monkeypatch.setattr(load_job_ads, "REQUESTS_PER_SECOND", 1000)
+    with load_job_ads.create_session() as session:
+        yield session
+
+
+def _total(session, params):
+    return load_job_ads._get_ads(session, load_job_ads.URL_FOR_SEARCH, load_job_ads._count_params(params))["total"]["value"]
+
+
+def _completed(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+# === Planning shards ===
+
+def test_plan_shards_add_up_to_the_total(session):
+    params = {"q": "", "limit": 100, "occupation-field": OCCUPATION_FIELDS[0][0]}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        [shards] = load_job_ads.plan_shards(executor, session, [params], shard_size=100)
+
+    totals = [_total(session, shard) for shard in shards]
+    assert len(shards) > 1
+    assert all(0 < total <= 100 for total in totals)
+    assert sum(totals) == ADS_PER_FIELD
+
+
+def test_plan_shards_keeps_small_searches_whole(session):
+    params = {"q": "", "limit": 100, "occupation-field": OCCUPATION_FIELDS[0][0]}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        shards = load_job_ads.plan_shards(
+            executor, session, [params, dict(params, **{"occupation-field": "unknown"})], shard_size=ADS_PER_FIELD,
+        )
+
+    assert shards == [[params], []]
+
+
+def test_split_by_dimension_returns_one_shard_per_value():
+    data = {
+        "total": {"value": 10},
+        "stats": [{"type": "region", "values": [{"concept_id": "a", "count": 6}, {"concept_id": "b", "count": 4}]}],
+    }
+    assert load_job_ads._split_by_dimension({"q": ""}, "region", data) == [
+        ({"q": "", "region": "a"}, 6),
+        ({"q": "", "region": "b"}, 4),
+    ]
+
+
+# Ads without a value for the dimension are missing from the stats, so the shards would miss them.
+@pytest.mark.parametrize("values", [
+    [{"concept_id": "a", "count": 6}, {"concept_id": "b", "count": 3}],
+    [{"concept_id": "a", "count": 10}],
+    [],
+])
+def test_split_by_dimension_falls_back_when_the_counts_do_not_add_up(values):
+    data = {"total": {"value": 10}, "stats": [{"type": "region", "values": values}]}
+    assert load_job_ads._split_by_dimension({"q": ""}, "region", data) is None
+
+
+def test_split_by_date_halves_the_window_with_an_overlap():
+    params = {"q": "", "published-after": "2025-01-01T00:00:00", "published-before": "2025-01-03T00:00:00"}
+    first, second = load_job_ads._split_by_date(None, params)
+
+    assert first["published-after"] == "2025-01-01T00:00:00"
+    assert first["published-before"] == "2025-01-02T00:00:01"
+    assert second["published-after"] == "2025-01-01T23:59:59"
+    assert second["published-before"] == "2025-01-03T00:00:00"
+
+
+def test_split_by_date_stops_at_narrow_windows():
+    params = {"published-after": "2025-01-01T00:00:00", "published-before": "2025-01-01T00:00:04"}
+    assert load_job_ads._split_by_date(None, params) is None
+
+
+# === Paging past the offset ceiling ===
+
+def test_search_windows_stops_when_the_window_cannot_move(capsys):
+    params = {"limit": 2, "published-after": "2025-01-01T00:00:00"}
+    hits = [{"id": str(i), "publication_date": "2025-01-01T00:00:01"} for i in range(2)]
+    window = [_completed({"total": {"value": 10}, "hits": hits}) for _ in range(2)]
+
+    pages = list(load_job_ads._search_windows(None, None, params, window))
+
+    assert pages == window
+    assert "Search window stuck after offset 2, 6 ads skipped" in capsys.readouterr().out
+
+
+def test_search_windows_pages_past_the_offset_ceiling(session):
+    params = {"q": "", "limit": 100, "occupation-field": OCCUPATION_FIELDS[0][0], "sort": "pubdate-asc"}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        window = load_job_ads._submit_window(executor, session, params).result()
+        pages = [page.result() for page in load_job_ads._search_windows(executor, session, params, window)]
+
+    assert len({ad["id"] for page in pages for ad in page["hits"]}) == ADS_PER_FIELD
+
+
+# The next window starts a second before the last ad of the previous one, so ads published in that second are kept.
+def test_search_windows_moves_published_after_to_the_last_ad(monkeypatch):
+    params = {"limit": 2, "published-after": "2025-01-01T00:00:00"}
+    first = [_completed({"total": {"value": 3}, "hits": [
+        {"id": "1", "publication_date": "2025-01-01T08:00:00"},
+        {"id": "2", "publication_date": "2025-01-01T10:00:00"},
+    ]})]
+    second = [_completed({"total": {"value": 2}, "hits": [
+        {"id": "2", "publication_date": "2025-01-01T10:00:00"},
+        {"id": "3", "publication_date": "2025-01-01T11:00:00"},
+    ]})]
+    submitted = []
+
+    def submit_window(executor, session, params):
+        submitted.append(params)
+        return _completed(second)
+
+    monkeypatch.setattr(load_job_ads, "_submit_window", submit_window)
+    pages = list(load_job_ads._search_windows(None, None, params, first))
+
+    assert pages == first + second
+    assert submitted == [{"limit": 2, "published-after": "2025-01-01T09:59:59"}]
+
+
+# === Watermarks ===
+
+def test_watermarks_are_saved_per_occupation_field(warehouse):
+    assert load_job_ads.get_watermarks() == {}
+
+    load_job_ads.save_watermark("a", datetime(2025, 1, 1, 12))
+    load_job_ads.save_watermark("b", datetime(2025, 1, 1, 13))
+    load_job_ads.save_watermark("a", datetime(2025, 1, 2, 12))
+
+    assert load_job_ads.get_watermarks() == {"a": datetime(2025, 1, 2, 12), "b": datetime(2025, 1, 1, 13)}
+
+
+# A failed load leaves the watermarks alone, so the next run searches the same ads again.
+def test_watermarks_are_saved_only_after_a_successful_load(warehouse, query, monkeypatch):
+    occupation_field = OCCUPATION_FIELDS[0][0]
+    create_pipeline = load_job_ads._create_pipeline
+
+    def create_failing_pipeline(*args, **kwargs):
+        pipeline = create_pipeline(*args, **kwargs)
+        def load(*args, **kwargs):
+            raise RuntimeError("load failed")
+        pipeline.load = load
+        return pipeline
+
+    monkeypatch.setattr(load_job_ads, "_create_pipeline", create_failing_pipeline)
+    with pytest.raises(RuntimeError, match="load failed"):
+        load_job_ads.run_pipeline("", "job_ads", (occupation_field,), landing_root=warehouse)
+    assert load_job_ads.get_watermarks() == {}
+
+    monkeypatch.setattr(load_job_ads, "_create_pipeline", create_pipeline)
+    time.sleep(1)  # Landing runs are named after the second they started in.
+    load_job_ads.run_pipeline("", "job_ads", (occupation_field,), landing_root=warehouse)
+
+    [(last_publication_date,)] = query("SELECT max(publication_date) FROM staging.job_ads")
+    assert load_job_ads.get_watermarks() == {occupation_field: last_publication_date.replace(tzinfo=None)}
@@ -0,0 +1,146 @@
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+# load_job_ads.py is in the repository root, two directories up from this file.
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import load_job_ads
+from mock_jobtech_api import OCCUPATION_FIELDS, synthetic_ads
+
+FIELD_IDS = tuple(concept_id for concept_id, _ in OCCUPATION_FIELDS)
+INGESTION_TIMESTAMP = "2025-01-02T00:00:00"
+
+
+# Answers every request with the given stream events, and keeps the requests.
+class StubAdapter(HTTPAdapter):
+    def __init__(self, events):
+        super().__init__()
+        self.events = events
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response._content = json.dumps(self.events).encode("utf8")
+        return response
+
+
+def _session(adapter):
+    session = load_job_ads.create_session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _ad(ad_id, headline, occupation_field="a"):
+    return {"id": ad_id, "headline": headline, "removed": False, "timestamp": 1735732800000,
+            "occupation_field": {"concept_id": occupation_field}}
+
+
+def _removal(ad_id, removed_date="2025-01-01T12:00:00"):
+    return {"id": ad_id, "removed": True, "removed_date": removed_date, "occupation_field": {"concept_id": "a"}}
+
+
+# === Reading the stream ===
+
+def test_stream_is_read_since_the_watermark_for_the_occupation_fields():
+    events = [_removal("1", "2025-01-01T13:00:00"), _ad("2", "Lärare")]
+    adapter = StubAdapter(events)
+    progress = {}
+    with _session(adapter) as session:
+        since = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+        assert load_job_ads._stream_events(session, since, ("a", "b"), progress) == events
+
+    [request] = adapter.requests
+    # The stream is read from an hour before the watermark (WATERMARK_OVERLAP), so late events are not missed.
+    assert parse_qs(urlsplit(request.url).query) == {"date": ["2025-01-01T11:00:00"], "occupation-concept-id": ["a", "b"]}
+    assert progress == {"last_event_date": datetime(2025, 1, 1, 13, tzinfo=timezone.utc)}
+
+
+def test_an_empty_stream_leaves_the_watermark_alone():
+    progress = {}
+    with _session(StubAdapter([])) as session:
+        assert load_job_ads._stream_events(session, datetime.now(timezone.utc), ("a",), progress) == []
+    assert progress == {}
+
+
+# === Removed and updated ads ===
+
+def test_removed_ads_get_a_row_each():
+    events = [_removal("1"), _ad("2", "Lärare"), {"removed": True, "removed_date": "2025-01-01T12:00:00"}]
+    progress = {}
+    rows = list(load_job_ads.removed_ads_resource(events, progress, INGESTION_TIMESTAMP))
+
+    assert rows == [{"id": "1", "removed_date": "2025-01-01T12:00:00", "ingestion_timestamp": INGESTION_TIMESTAMP}]
+    assert progress == {"removed_ads": 1}
+
+
+# Runs updated_ads_resource over the events and sorts what it yields: the ads (Arrow tables) and the history rows.
+def _updated_ads(events, content_hashes, progress, landing_run_dir=None):
+    ads, history = [], []
+    for item in load_job_ads.updated_ads_resource(
+        events, progress, landing_run_dir, INGESTION_TIMESTAMP,
+        text_table="job_ads_text", content_hashes=content_hashes, history_table="job_ads_history",
+    ):
+        if isinstance(item, dict):
+            if "change_type" in item:
+                history.append((item["id"], item["change_type"]))
+        else:
+            ads += item.column("id").to_pylist()
+    return ads, history
+
+
+# Edits seen in the stream go through the content hash check, so only new and changed ads are loaded.
+def test_updated_ads_are_loaded_when_new_or_changed(tmp_path):
+    content_hashes = load_job_ads.ContentHashes()
+    _updated_ads([_ad("2", "Lärare"), _ad("3", "Kock")], content_hashes, {})
+
+    progress = {}
+    events = [_ad("1", "Sjuksköterska"), _ad("2", "Lärare i matematik"), _ad("3", "Kock"), _removal("4")]
+    ads, history = _updated_ads(events, content_hashes, progress, landing_run_dir=tmp_path)
+
+    assert ads == ["1", "2"]
+    assert history == [("1", "new"), ("2", "changed")]
+    assert progress == {"ads": 3, "new": 1, "changed": 1, "unchanged": 1}
+    # The ads of the stream are landed with the run, so a replay applies the edits as well.
+    [landed] = load_job_ads._read_landing_file(tmp_path / "occupation_field=a" / "stream" / "part-00000.jsonl.zst")
+    assert [ad["id"] for ad in landed["hits"]] == ["1", "2", "3"]
+
+
+# === stream_pipeline ===
+
+# Some of the ads served by the mock API are edited and some are removed, so the stream reports both.
+@pytest.fixture
+def warehouse_ads():
+    return synthetic_ads(200, edited_share=0.2, removed_share=0.1)
+
+
+def test_stream_pipeline_advances_the_watermark(warehouse, warehouse_ads, query):
+    removed = int((warehouse_ads.removed > 0).sum())
+    updated = int(((warehouse_ads.updated > 0) & (warehouse_ads.removed == 0)).sum())
+    latest_event = datetime.fromtimestamp(max(warehouse_ads.removed.max(), warehouse_ads.updated.max()), tz=timezone.utc)
+
+    first = load_job_ads.stream_pipeline("job_ads", FIELD_IDS, landing_root=warehouse)
+
+    assert first == {"removed_ads": removed, "new": updated, "changed": 0, "unchanged": 0}
+    assert load_job_ads.get_watermarks() == {load_job_ads.STREAM_WATERMARK: latest_event.replace(tzinfo=None)}
+
+    # The next run reads the stream from the watermark, less the overlap, so it sees the same events again.
+    # They change nothing: the removals are merged on id and the edited ads are unchanged.
+    time.sleep(1)  # Landing runs are named after the second they started in.
+    second = load_job_ads.stream_pipeline("job_ads", FIELD_IDS, landing_root=warehouse)
+
+    assert second == {"removed_ads": removed, "new": 0, "changed": 0, "unchanged": updated}
+    assert query("SELECT count(*) FROM staging.job_ads_removed") == [(removed,)]
+    assert load_job_ads.get_watermarks() == {load_job_ads.STREAM_WATERMARK: latest_event.replace(tzinfo=None)}
@@ -5,7 +5,9 @@ setup(
     packages=find_packages(exclude=["orchestration_tests"]),
     install_requires=[
         "dagster",
-        "dagster-cloud"
+        "dagster-cloud",
+        "dagster-dbt",
+        "dbt-duckdb"
     ],
     extras_require={"dev": ["dagster-webserver", "pytest"]},
 )